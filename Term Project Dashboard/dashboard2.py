@@ -1,10 +1,106 @@
 import streamlit as st
-import pandas as pd
 import altair as alt
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.chart_data import prune_chart_data
+from common.compact_loader import SOCIAL_MEDIA_SCHEMA, load_compact, memory_report
+from common.data_cube import AggregateCube
+from common.filter_cache import FilterCache
+from common.filter_index import FilterIndex
+from common.instrumentation import start_profiler, tracked_cache
+from common.lod import lod_points
 
 # Absolute-safe path to ensure compatibility
-df = pd.read_csv(os.path.join(os.path.dirname(__file__), "social_media_vs_productivity.csv"))
+DATA_PATH = os.path.join(os.path.dirname(__file__), "social_media_vs_productivity.csv")
+
+# Rows missing any of these are dropped from every chart
+REQUIRED_COLUMNS = [
+    'daily_social_media_time', 'work_hours_per_day',
+    'actual_productivity_score', 'perceived_productivity_score',
+    'job_type', 'gender', 'stress_level', 'social_platform_preference'
+]
+
+# Sidebar filter dimensions; range columns map to their slider step
+CATEGORY_COLUMNS = ['gender', 'job_type', 'social_platform_preference',
+                    'uses_focus_apps', 'has_digital_wellbeing_enabled']
+RANGE_STEPS = {'stress_level': 1, 'sleep_hours': 0.1}
+
+# Columns averaged by the bar charts
+BAR_MEASURES = ['work_hours_per_day', 'actual_productivity_score']
+
+
+@tracked_cache(st.cache_resource)
+def load_data(mtime):
+    """Load the survey once per file version and share it across sessions."""
+    # Categoricals and small nullable ints keep the shared copy small
+    return load_compact(DATA_PATH, SOCIAL_MEDIA_SCHEMA)
+
+
+@st.cache_resource
+def get_filter_cache(mtime):
+    """One filtered-frame cache per dataset version, shared by every session."""
+    return FilterCache(max_entries=64, max_bytes=256 * 1024 ** 2)
+
+
+@tracked_cache(st.cache_resource)
+def get_filter_index(mtime):
+    """Bitmaps and sorted indexes for every sidebar filter, built once per dataset version."""
+    return FilterIndex(
+        load_data(mtime),
+        category_columns=CATEGORY_COLUMNS,
+        range_columns=list(RANGE_STEPS),
+        required_columns=REQUIRED_COLUMNS,
+    )
+
+
+@tracked_cache(st.cache_resource)
+def get_cube(mtime):
+    """Sums and counts of the bar charts' measures over every filter dimension, built once per dataset version."""
+    return AggregateCube(load_data(mtime), CATEGORY_COLUMNS, RANGE_STEPS, BAR_MEASURES, REQUIRED_COLUMNS)
+
+
+def selected_values(event, param, field):
+    """Values of `field` picked in a point selection returned by st.altair_chart(on_select=...)."""
+    if not event:
+        return []
+    points = event.selection.get(param) or []
+    return [point[field] for point in points if field in point]
+
+
+def filter_selection(filters):
+    """The sidebar filters as category selections and inclusive ranges."""
+    platforms, genders, jobs, stress_range, sleep_range, focus_only, wellbeing_only = filters
+    categories = {
+        'gender': genders,
+        'job_type': jobs,
+        'social_platform_preference': platforms,
+    }
+    if focus_only:
+        categories['uses_focus_apps'] = [True]
+    if wellbeing_only:
+        categories['has_digital_wellbeing_enabled'] = [True]
+    return categories, {'stress_level': stress_range, 'sleep_hours': sleep_range}
+
+
+def filter_data(df, index, filters):
+    """Apply the sidebar filters as bitmap ANDs and binary searches on the index."""
+    positions = index.select(*filter_selection(filters))
+    return df.iloc[positions]
+
+
+# Timing spans and the sidebar profile panel are only active with ?profile=1
+profiler = start_profiler()
+
+data_version = os.path.getmtime(DATA_PATH)
+with profiler.span("load data"):
+    df = load_data(data_version)
+filter_cache = get_filter_cache(data_version)
+with profiler.span("build filter index"):
+    filter_index = get_filter_index(data_version)
+with profiler.span("build cube"):
+    cube = get_cube(data_version)
 
 
 st.title("📉 Social Media, Productivity & Human Patterns")
@@ -46,7 +142,7 @@ min_sleep = float(df['sleep_hours'].min())
 max_sleep = float(df['sleep_hours'].max())
 sleep_range = st.sidebar.slider(
     "Sleep Hours Range", min_value=round(min_sleep,1), max_value=round(max_sleep,1),
-    value=(round(min_sleep,1), round(max_sleep,1)),
+    value=(round(min_sleep,1), round(max_sleep,1)), step=0.1,
     help="Filter users by the number of hours they sleep per night."
 )
 
@@ -61,26 +157,44 @@ only_digital_wellbeing = st.sidebar.checkbox(
     help="Restrict dataset to users who have enabled screen-time or wellbeing features on their device."
 )
 
+# --- RENDERING ---
+server_side = st.sidebar.checkbox(
+    "Evaluate Charts on the Server", value=False,
+    help="Compute the averages and the click-to-filter selections in Python and send only "
+         "the summary rows and matching points to the browser."
+)
+
+# --- MEMORY REPORT ---
+if st.sidebar.checkbox("Show Memory Usage by Column", value=False,
+                       help="Compare bytes per column with default pandas dtypes against the compact dtypes."):
+    st.sidebar.dataframe(memory_report(df))
+
 # -----------------------
 # 📌 FILTER DATA
 # -----------------------
-df = df[
-    (df['gender'].isin(gender_filter)) &
-    (df['job_type'].isin(job_filter)) &
-    (df['stress_level'].between(*stress_range)) &
-    (df['sleep_hours'].between(*sleep_range)) &
-    (df['social_platform_preference'].isin(platform_filter))
-]
-if show_focus_users:
-    df = df[df['uses_focus_apps'] == True]
-if only_digital_wellbeing:
-    df = df[df['has_digital_wellbeing_enabled'] == True]
+# Normalize the widget state so equivalent selections (e.g. same platforms in a
+# different order) share one cache entry across all sessions
+filters = (
+    tuple(sorted(platform_filter)),
+    tuple(sorted(gender_filter)),
+    tuple(sorted(job_filter)),
+    tuple(stress_range),
+    # On the cube's 0.1 cuts, so the bar charts match the filtered rows exactly
+    tuple(round(hours, 1) for hours in sleep_range),
+    bool(show_focus_users),
+    bool(only_digital_wellbeing),
+)
+# Bar charts sum cube cells; only the scatter plots read (sampled) rows
+with profiler.span("select cube cells"):
+    cells = cube.select(*filter_selection(filters))
+with profiler.span("filter"):
+    df = filter_cache.get_or_compute(filters, lambda: filter_data(df, filter_index, filters))
 
-df = df.dropna(subset=[
-    'daily_social_media_time', 'work_hours_per_day',
-    'actual_productivity_score', 'perceived_productivity_score',
-    'job_type', 'gender', 'stress_level', 'social_platform_preference'
-])
+stats = filter_cache.stats()
+st.sidebar.caption(
+    f"Filter cache: {stats['hits']} hits, {stats['misses']} misses, "
+    f"{stats['entries']} entries ({stats['bytes'] / 1024 ** 2:.1f} MB)"
+)
 
 # -----------------------
 # 📌 INTRO TEXT
@@ -102,31 +216,76 @@ Although men and women may vary in work sector or screen time, the visualized da
 The first two charts reveal that while gender may influence the **average work hours**, the relationship between social media use and productivity-related time investment is **remarkably consistent** across genders.
 """)
 
-gender_selection = alt.selection_multi(fields=["gender"])
+# One row per gender, summed from the cube
+gender_means = cube.means('gender', 'work_hours_per_day', cells)
 
-chart2 = alt.Chart(df).mark_bar().encode(
-    x=alt.X("gender:N", axis=alt.Axis(labelAngle=0), title="Gender"),
-    y=alt.Y("mean(work_hours_per_day):Q", title="Avg Work Hours"),
-    color=alt.condition(gender_selection, "gender:N", alt.value("lightgray")),
-    tooltip=["gender", "mean(work_hours_per_day):Q"]
-).add_selection(gender_selection).properties(
-    width=400, height=400,
-    title="👥 Avg Work Hours by Gender (Click to Filter Chart 1)"
-)
+if server_side:
+    gender_selection = alt.selection_point(name="gender_pick", fields=["gender"])
 
-chart1 = alt.Chart(df).transform_filter(
-    gender_selection
-).mark_circle(size=70).encode(
-    x=alt.X("daily_social_media_time:Q", title="Daily Social Media Time (hrs)", axis=alt.Axis(labelAngle=0)),
-    y=alt.Y("work_hours_per_day:Q", title="Work Hours Per Day"),
-    color="gender:N",
-    tooltip=["gender", "job_type", "daily_social_media_time", "work_hours_per_day"]
-).properties(
-    width=400, height=400,
-    title="📱 Social Media Time vs Work Hours"
-)
+    chart2 = alt.Chart(gender_means).mark_bar().encode(
+        x=alt.X("gender:N", axis=alt.Axis(labelAngle=0), title="Gender"),
+        y=alt.Y("work_hours_per_day:Q", title="Avg Work Hours"),
+        color=alt.condition(gender_selection, "gender:N", alt.value("lightgray")),
+        tooltip=["gender", alt.Tooltip("work_hours_per_day:Q", title="Avg Work Hours")]
+    ).add_params(gender_selection).properties(
+        width=400, height=400,
+        title="👥 Avg Work Hours by Gender (Click to Filter Chart 1)"
+    )
+
+    col1, col2 = st.columns(2)
+    with col1:
+        gender_event = profiler.altair_chart("gender bars", prune_chart_data(chart2), on_select="rerun", key="gender_chart")
+
+    # The click filter runs in Python; only the matching points are sent
+    picked = selected_values(gender_event, "gender_pick", "gender")
+    scatter_rows = df[df['gender'].isin(picked)] if picked else df
+    scatter_rows, scatter_title = lod_points(
+        scatter_rows[["gender", "job_type", "daily_social_media_time", "work_hours_per_day"]],
+        "daily_social_media_time", "work_hours_per_day", "📱 Social Media Time vs Work Hours"
+    )
+
+    chart1 = alt.Chart(scatter_rows).mark_circle(size=70).encode(
+        x=alt.X("daily_social_media_time:Q", title="Daily Social Media Time (hrs)", axis=alt.Axis(labelAngle=0)),
+        y=alt.Y("work_hours_per_day:Q", title="Work Hours Per Day"),
+        color="gender:N",
+        tooltip=["gender", "job_type", "daily_social_media_time", "work_hours_per_day"]
+    ).properties(
+        width=400, height=400,
+        title=scatter_title
+    )
+    with col2:
+        profiler.altair_chart("gender scatter", prune_chart_data(chart1))
+else:
+    gender_selection = alt.selection_multi(fields=["gender"])
+
+    chart2 = alt.Chart(gender_means).mark_bar().encode(
+        x=alt.X("gender:N", axis=alt.Axis(labelAngle=0), title="Gender"),
+        y=alt.Y("mean(work_hours_per_day):Q", title="Avg Work Hours"),
+        color=alt.condition(gender_selection, "gender:N", alt.value("lightgray")),
+        tooltip=["gender", "mean(work_hours_per_day):Q"]
+    ).add_selection(gender_selection).properties(
+        width=400, height=400,
+        title="👥 Avg Work Hours by Gender (Click to Filter Chart 1)"
+    )
+
+    scatter_rows, scatter_title = lod_points(
+        df[["gender", "job_type", "daily_social_media_time", "work_hours_per_day"]],
+        "daily_social_media_time", "work_hours_per_day", "📱 Social Media Time vs Work Hours"
+    )
+
+    chart1 = alt.Chart(scatter_rows).transform_filter(
+        gender_selection
+    ).mark_circle(size=70).encode(
+        x=alt.X("daily_social_media_time:Q", title="Daily Social Media Time (hrs)", axis=alt.Axis(labelAngle=0)),
+        y=alt.Y("work_hours_per_day:Q", title="Work Hours Per Day"),
+        color="gender:N",
+        tooltip=["gender", "job_type", "daily_social_media_time", "work_hours_per_day"]
+    ).properties(
+        width=400, height=400,
+        title=scatter_title
+    )
 
-st.altair_chart(chart2 | chart1)
+    profiler.altair_chart("gender charts", prune_chart_data(chart2 | chart1))
 
 # -----------------------
 # 📊 CHART SET 2: Platform
@@ -138,41 +297,98 @@ Different platforms shape our interaction with digital environments. This pair o
 While platform choice may reflect a user's habits or age group, it also affects how efficiently they work — and how overwhelmed they feel. 
 """)
 
-platform_selection = alt.selection_multi(fields=["social_platform_preference"])
-
-# Bar chart base
-base_chart3 = alt.Chart(df).mark_bar().encode(
-    x=alt.X("social_platform_preference:N", axis=alt.Axis(labelAngle=0), title="Preferred Platform"),
-    y=alt.Y("mean(actual_productivity_score):Q", title="Avg Actual Productivity", scale=alt.Scale(domain=[4.5, 5])),
-    color=alt.condition(platform_selection, "social_platform_preference:N", alt.value("lightgray")),
-    tooltip=["social_platform_preference", "mean(actual_productivity_score):Q"]
-).add_selection(platform_selection).properties(
-    width=400, height=400,
-    title="📊 Productivity by Platform (Click to Filter Chart 4)"
-)
+platform_means = cube.means('social_platform_preference', 'actual_productivity_score', cells)
 
-# Text labels on bars
-labels = alt.Chart(df).mark_text(
-    align='center', baseline='bottom', dy=-4, fontSize=12
-).encode(
-    x=alt.X("social_platform_preference:N"),
-    y=alt.Y("mean(actual_productivity_score):Q", scale=alt.Scale(domain=[4.5, 5])),
-    text=alt.Text("mean(actual_productivity_score):Q", format=".2f")
-).transform_filter(platform_selection)
-
-chart3 = base_chart3 + labels
-
-# Scatter chart
-chart4 = alt.Chart(df).transform_filter(
-    platform_selection
-).mark_circle(size=70).encode(
-    x=alt.X("stress_level:Q", title="Stress Level", axis=alt.Axis(labelAngle=0)),
-    y=alt.Y("actual_productivity_score:Q", title="Actual Productivity Score"),
-    color=alt.Color("social_platform_preference:N", legend=alt.Legend(title="Platform")),
-    tooltip=["social_platform_preference", "stress_level", "actual_productivity_score"]
-).properties(
-    width=400, height=400,
-    title="😵 Stress vs Productivity (by Platform)"
-)
+if server_side:
+    platform_selection = alt.selection_point(name="platform_pick", fields=["social_platform_preference"])
+
+    base_chart3 = alt.Chart(platform_means).mark_bar().encode(
+        x=alt.X("social_platform_preference:N", axis=alt.Axis(labelAngle=0), title="Preferred Platform"),
+        y=alt.Y("actual_productivity_score:Q", title="Avg Actual Productivity", scale=alt.Scale(domain=[4.5, 5])),
+        color=alt.condition(platform_selection, "social_platform_preference:N", alt.value("lightgray")),
+        tooltip=["social_platform_preference",
+                 alt.Tooltip("actual_productivity_score:Q", title="Avg Actual Productivity")]
+    ).add_params(platform_selection).properties(
+        width=400, height=400,
+        title="📊 Productivity by Platform (Click to Filter Chart 4)"
+    )
+
+    labels = alt.Chart(platform_means).mark_text(
+        align='center', baseline='bottom', dy=-4, fontSize=12
+    ).encode(
+        x=alt.X("social_platform_preference:N"),
+        y=alt.Y("actual_productivity_score:Q", scale=alt.Scale(domain=[4.5, 5])),
+        text=alt.Text("actual_productivity_score:Q", format=".2f")
+    ).transform_filter(platform_selection)
+
+    chart3 = base_chart3 + labels
+
+    col3, col4 = st.columns(2)
+    with col3:
+        platform_event = profiler.altair_chart("platform bars", prune_chart_data(chart3), on_select="rerun", key="platform_chart")
+
+    picked = selected_values(platform_event, "platform_pick", "social_platform_preference")
+    scatter_rows = df[df['social_platform_preference'].isin(picked)] if picked else df
+    scatter_rows, scatter_title = lod_points(
+        scatter_rows[["social_platform_preference", "stress_level", "actual_productivity_score"]],
+        "stress_level", "actual_productivity_score", "😵 Stress vs Productivity (by Platform)",
+        strata="social_platform_preference"
+    )
+
+    chart4 = alt.Chart(scatter_rows).mark_circle(size=70).encode(
+        x=alt.X("stress_level:Q", title="Stress Level", axis=alt.Axis(labelAngle=0)),
+        y=alt.Y("actual_productivity_score:Q", title="Actual Productivity Score"),
+        color=alt.Color("social_platform_preference:N", legend=alt.Legend(title="Platform")),
+        tooltip=["social_platform_preference", "stress_level", "actual_productivity_score"]
+    ).properties(
+        width=400, height=400,
+        title=scatter_title
+    )
+    with col4:
+        profiler.altair_chart("platform scatter", prune_chart_data(chart4))
+else:
+    platform_selection = alt.selection_multi(fields=["social_platform_preference"])
+
+    # Bar chart base
+    base_chart3 = alt.Chart(platform_means).mark_bar().encode(
+        x=alt.X("social_platform_preference:N", axis=alt.Axis(labelAngle=0), title="Preferred Platform"),
+        y=alt.Y("mean(actual_productivity_score):Q", title="Avg Actual Productivity", scale=alt.Scale(domain=[4.5, 5])),
+        color=alt.condition(platform_selection, "social_platform_preference:N", alt.value("lightgray")),
+        tooltip=["social_platform_preference", "mean(actual_productivity_score):Q"]
+    ).add_selection(platform_selection).properties(
+        width=400, height=400,
+        title="📊 Productivity by Platform (Click to Filter Chart 4)"
+    )
+
+    # Text labels on bars
+    labels = alt.Chart(platform_means).mark_text(
+        align='center', baseline='bottom', dy=-4, fontSize=12
+    ).encode(
+        x=alt.X("social_platform_preference:N"),
+        y=alt.Y("mean(actual_productivity_score):Q", scale=alt.Scale(domain=[4.5, 5])),
+        text=alt.Text("mean(actual_productivity_score):Q", format=".2f")
+    ).transform_filter(platform_selection)
+
+    chart3 = base_chart3 + labels
+
+    # Scatter chart
+    scatter_rows, scatter_title = lod_points(
+        df[["social_platform_preference", "stress_level", "actual_productivity_score"]],
+        "stress_level", "actual_productivity_score", "😵 Stress vs Productivity (by Platform)",
+        strata="social_platform_preference"
+    )
+    chart4 = alt.Chart(scatter_rows).transform_filter(
+        platform_selection
+    ).mark_circle(size=70).encode(
+        x=alt.X("stress_level:Q", title="Stress Level", axis=alt.Axis(labelAngle=0)),
+        y=alt.Y("actual_productivity_score:Q", title="Actual Productivity Score"),
+        color=alt.Color("social_platform_preference:N", legend=alt.Legend(title="Platform")),
+        tooltip=["social_platform_preference", "stress_level", "actual_productivity_score"]
+    ).properties(
+        width=400, height=400,
+        title=scatter_title
+    )
+
+    profiler.altair_chart("platform charts", prune_chart_data(chart3 | chart4))
 
-st.altair_chart(chart3 | chart4)
+profiler.render_panel()
@@ -0,0 +1,115 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+import pyarrow as pa
+
+# projectChart changes into its own folder on import, so remember where we were launched from
+LAUNCH_DIR = os.getcwd()
+
+import projectChart
+from common.shared_data import prune_data_files, save_html
+
+# Set in each worker process by attach_frame
+_shared_data = None
+_shared_source = None
+
+
+def share_frame(data):
+    """Write the DataFrame once as an Arrow IPC file in shared memory (/dev/shm when available)."""
+    folder = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    fd, path = tempfile.mkstemp(prefix="projectChart_", suffix=".arrow", dir=folder)
+    os.close(fd)
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return path
+
+
+def shared_dtype(arrow_type):
+    """Float columns stay Arrow-backed, so they read the memory-mapped buffers in place."""
+    return pd.ArrowDtype(arrow_type) if pa.types.is_floating(arrow_type) else None
+
+
+def attach_frame(path):
+    """Worker initializer: memory-map the shared Arrow file instead of unpickling a copy.
+
+    The float columns, most of the table, are views of the shared file. The small
+    integer, boolean and categorical columns are converted as usual, which copies
+    one or two bytes per row into each worker.
+    """
+    global _shared_data, _shared_source
+    _shared_source = pa.memory_map(path, "r")
+    table = pa.ipc.open_file(_shared_source).read_all()
+    _shared_data = table.to_pandas(types_mapper=shared_dtype)
+
+
+def render_chart(name, output_dir, external_data=False):
+    chart_function, filename = projectChart.CHARTS[name]
+    start = time.perf_counter()
+    visual = chart_function(_shared_data)
+    if external_data:
+        save_html(visual, filename, output_dir)
+    else:
+        visual.save(os.path.join(output_dir, filename))
+    return name, filename, time.perf_counter() - start
+
+
+def batch_render(names=None, output_dir=".", workers=None, external_data=False):
+    """Render the selected charts in a process pool and return (name, filename, seconds) per chart."""
+    names = list(names or projectChart.CHARTS)
+    unknown = [name for name in names if name not in projectChart.CHARTS]
+    if unknown:
+        raise ValueError(f"Unknown chart(s): {', '.join(unknown)}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    data = projectChart.load_data()
+    shared_path = share_frame(data)
+    results = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=attach_frame,
+                                 initargs=(shared_path,)) as pool:
+            futures = [pool.submit(render_chart, name, output_dir, external_data) for name in names]
+            for future in as_completed(futures):
+                results.append(future.result())
+    finally:
+        os.remove(shared_path)
+    if external_data:
+        prune_data_files(output_dir)
+
+    # Report in the order the charts were requested
+    order = {name: i for i, name in enumerate(names)}
+    return sorted(results, key=lambda result: order[result[0]])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the term project charts in parallel.")
+    parser.add_argument("charts", nargs="*", help="Charts to render, e.g. chart1 chart14 (default: all)")
+    parser.add_argument("-o", "--output-dir", default=".", help="Folder to write the HTML files to")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--external-data", action="store_true",
+                        help="Write each dataset once to data/ and have the HTML files load it by URL")
+    args = parser.parse_args()
+
+    output_dir = os.path.join(LAUNCH_DIR, args.output_dir)
+
+    start = time.perf_counter()
+    try:
+        results = batch_render(args.charts, output_dir, args.workers, args.external_data)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    total = time.perf_counter() - start
+
+    for name, filename, seconds in results:
+        print(f"{name:<8} {seconds:7.3f}s  {filename}")
+    print(f"Rendered {len(results)} chart(s) in {total:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,41 @@
 import altair as alt
+import numpy as np
 import pandas as pd
+import argparse
 import sys
 import os
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.build_manifest import BuildManifest
+from common.chunked import CHUNK_ROWS, GroupMoments, PresentCounts, Reservoir, scan_csv
+from common.compact_loader import SOCIAL_MEDIA_SCHEMA, compact_frame, load_compact
+from common.derived import binned, store_for
+from common.group_summary import grouped_summary
+from common.lod import MAX_POINTS, approximate_title, lod_points, population
+from common.pushdown import bin_params
+from common.sketches import TableSketch, attach, cached_sketch, column_quantiles, column_range
+
+# Derived columns shared by the chart builders, computed once per loaded frame
+FEATURES = {
+    "job_satisfaction_bin": binned("job_satisfaction_score", bins=6),
+}
+
+# Names the finished chart table a --stream stand-in frame already is (see stream_inputs)
+STREAM_ATTR = "stream_table"
+
+
+def precomputed(data, table):
+    """True when data is already the named chart table (built by stream_inputs)."""
+    return data.attrs.get(STREAM_ATTR) == table
+
+
 def chart1(data):
-    chart = alt.Chart(data, title="Social Media vs Actual Productivity").mark_circle(size=20).encode(
+    # Large surveys are drawn from a sample that keeps every platform and the outliers
+    plot_data, title = lod_points(data, "daily_social_media_time", "actual_productivity_score",
+                                  "Social Media vs Actual Productivity", strata="social_platform_preference")
+
+    chart = alt.Chart(plot_data, title=title).mark_circle(size=20).encode(
         x=alt.X("daily_social_media_time:Q", title="Daily Social Media Usage (Hours per Day)"),
         y=alt.Y("actual_productivity_score:Q", title="Actual Productivity (Hours per Day)"),
         color=alt.Color("social_platform_preference:N", title="Preferred Social Platform"),
@@ -24,7 +54,10 @@ def chart1(data):
     return chart
 
 def chart2(data):
-    chart = alt.Chart(data, title="Social Media vs Perceived Productivity").mark_circle(size=20).encode(
+    plot_data, title = lod_points(data, "daily_social_media_time", "perceived_productivity_score",
+                                  "Social Media vs Perceived Productivity", strata="social_platform_preference")
+
+    chart = alt.Chart(plot_data, title=title).mark_circle(size=20).encode(
         x=alt.X("daily_social_media_time:Q", title="Daily Social Media Usage (Hours per Day)"),
         y=alt.Y("perceived_productivity_score:Q", title="Actual Productivity (Hours per Day)"),
         color=alt.Color("social_platform_preference:N", title="Preferred Social Platform"),
@@ -44,8 +77,7 @@ def chart2(data):
 
 def chart3(data):
     # Get min and max stress levels
-    stress_min = data["stress_level"].min()
-    stress_max = data["stress_level"].max()
+    stress_min, stress_max = column_range(data, "stress_level")
 
     chart = alt.Chart(data, title="Average Screen Time Before Sleep vs Sleep Duration").mark_bar().encode(
         x=alt.X("sleep_hours:Q", bin=alt.Bin(maxbins=10), title="Average Hours Slept Per Day"),
@@ -73,10 +105,12 @@ def chart3(data):
 
 def chart4(data):
     # Get min and max stress levels
-    breaks_min = data["breaks_during_work"].min()
-    breaks_max = data["breaks_during_work"].max()
+    breaks_min, breaks_max = column_range(data, "breaks_during_work")
+
+    plot_data, title = lod_points(data, "daily_social_media_time", "actual_productivity_score",
+                                  "Average Screen Time Before Sleep vs Sleep Duration")
 
-    chart = alt.Chart(data, title="Average Screen Time Before Sleep vs Sleep Duration").mark_circle(size=20).encode(
+    chart = alt.Chart(plot_data, title=title).mark_circle(size=20).encode(
         x=alt.X("daily_social_media_time:Q", title="Daily Hours on Social Media"),
         y=alt.Y("actual_productivity_score:Q", title="Actual Productivity Score"),
         color=alt.Color("breaks_during_work:Q", 
@@ -152,8 +186,10 @@ def chart6(data):
 
 def chart7(data):
     plot_data = data[['actual_productivity_score', 'perceived_productivity_score']].dropna()
+    plot_data, title = lod_points(plot_data, "perceived_productivity_score", "actual_productivity_score",
+                                  "Perceived vs Actual Productivity")
 
-    chart = alt.Chart(plot_data, title="Perceived vs Actual Productivity").mark_circle(size=60, opacity=0.6).encode(
+    chart = alt.Chart(plot_data, title=title).mark_circle(size=60, opacity=0.6).encode(
         x=alt.X("perceived_productivity_score:Q", title="Perceived Productivity"),
         y=alt.Y("actual_productivity_score:Q", title="Actual Productivity"),
         tooltip=["perceived_productivity_score", "actual_productivity_score"]
@@ -163,8 +199,7 @@ def chart7(data):
 
 
 def chart8(data):
-    plot_data = data[['actual_productivity_score', 'job_satisfaction_score']].dropna()
-    plot_data['job_satisfaction_bin'] = pd.cut(plot_data['job_satisfaction_score'], bins=6).astype(str)
+    plot_data = store_for(data, FEATURES).frame(['actual_productivity_score', 'job_satisfaction_bin'])
 
     chart = alt.Chart(plot_data, title="Actual Productivity by Job Satisfaction Level").mark_bar().encode(
         x=alt.X("job_satisfaction_bin:N", title="Job Satisfaction Level (Binned)"),
@@ -178,8 +213,7 @@ def chart8(data):
 
 
 def chart9(data):
-    plot_data = data[['daily_social_media_time', 'job_satisfaction_score']].dropna()
-    plot_data['job_satisfaction_bin'] = pd.cut(plot_data['job_satisfaction_score'], bins=6).astype(str)
+    plot_data = store_for(data, FEATURES).frame(['daily_social_media_time', 'job_satisfaction_bin'])
 
     chart = alt.Chart(plot_data, title="Social Media Time by Job Satisfaction Level").mark_bar().encode(
         x=alt.X("job_satisfaction_bin:N", title="Job Satisfaction Level (Binned)"),
@@ -193,8 +227,7 @@ def chart9(data):
 
 
 def chart10(data):
-    plot_data = data[['breaks_during_work', 'job_satisfaction_score']].dropna()
-    plot_data['job_satisfaction_bin'] = pd.cut(plot_data['job_satisfaction_score'], bins=6).astype(str)
+    plot_data = store_for(data, FEATURES).frame(['breaks_during_work', 'job_satisfaction_bin'])
 
     chart = alt.Chart(plot_data, title="Breaks per Day by Job Satisfaction Level").mark_bar().encode(
         x=alt.X("job_satisfaction_bin:N", title="Job Satisfaction Level (Binned)"),
@@ -208,8 +241,7 @@ def chart10(data):
 
 def chart11(data):
 
-    time_min = data["stress_level"].min()
-    time_max = data["stress_level"].max()
+    time_min, time_max = column_range(data, "stress_level")
 
     plot_data = data[['job_type', 'actual_productivity_score', 'daily_social_media_time']].dropna()
 
@@ -234,14 +266,11 @@ def chart11(data):
     return chart
 
 def chart12(data):
-    plot_data = data[['daily_social_media_time', 'job_satisfaction_score']].dropna()
+    plot_data = store_for(data, FEATURES).frame(['daily_social_media_time', 'job_satisfaction_bin'])
+    low, high = column_quantiles(data, 'daily_social_media_time', [0.05, 0.95])
     plot_data = plot_data[
-        plot_data['daily_social_media_time'].between(
-            plot_data['daily_social_media_time'].quantile(0.05),
-            plot_data['daily_social_media_time'].quantile(0.95)
-        )  # Removes outliers (5th to 95th percentile)
+        plot_data['daily_social_media_time'].between(low, high)  # Removes outliers (5th to 95th percentile)
     ]
-    plot_data['job_satisfaction_bin'] = pd.cut(plot_data['job_satisfaction_score'], bins=6).astype(str)
 
     chart = alt.Chart(plot_data, title="Social Media Time by Job Satisfaction Level - Data Cleaned (Only 5th-95th Quartiles)").mark_bar().encode(
         x=alt.X("job_satisfaction_bin:N", title="Job Satisfaction Level (Binned)"),
@@ -277,111 +306,120 @@ def chart13(data):
     return chart
 
 
-def chart14(data):
-    plot_data = data[['gender', 'actual_productivity_score']].dropna()
+# Metrics compared across genders in chart14-22, with their axis titles
+GENDER_METRICS = {
+    "actual_productivity_score": "Avg Actual Productivity",
+    "daily_social_media_time": "Avg Social Media Time (hrs/day)",
+    "breaks_during_work": "Avg Breaks per Day",
+    "stress_level": "Avg Stress Level",
+    "job_satisfaction_score": "Avg Job Satisfaction",
+    "days_feeling_burnout_per_month": "Avg Burnout Days/Month",
+    "coffee_consumption_per_day": "Avg Cups of Coffee/Day",
+    "weekly_offline_hours": "Avg Offline Hours/Week",
+}
 
-    chart = alt.Chart(plot_data, title="Actual Productivity by Gender").mark_bar().encode(
-        x=alt.X("gender:N", title="Gender"),
-        y=alt.Y("mean(actual_productivity_score):Q", title="Avg Actual Productivity"),
-        tooltip=["gender", "mean(actual_productivity_score):Q"]
-    ).properties(width=600, height=400).configure_axisX(labelAngle=0)
+_gender_summary_cache = {"data": None, "summary": None}
 
-    return chart
 
+def gender_summary(data):
+    """Per-gender mean, count, std and missing count of every GENDER_METRICS column.
 
-def chart15(data):
-    plot_data = data[['gender', 'daily_social_media_time']].dropna()
+    Computed in one grouped scan and reused by every gender chart built from the same frame.
+    """
+    if precomputed(data, "gender_summary"):
+        return data
+    if _gender_summary_cache["data"] is not data:
+        _gender_summary_cache["summary"] = grouped_summary(data, "gender", list(GENDER_METRICS))
+        _gender_summary_cache["data"] = data
+    return _gender_summary_cache["summary"]
+
+
+def gender_mean_chart(data, metric, title):
+    plot_data = gender_summary(data)
+    plot_data = plot_data[plot_data["metric"] == metric]
 
-    chart = alt.Chart(plot_data, title="Daily Social Media Time by Gender").mark_bar().encode(
+    chart = alt.Chart(plot_data, title=title).mark_bar().encode(
         x=alt.X("gender:N", title="Gender"),
-        y=alt.Y("mean(daily_social_media_time):Q", title="Avg Social Media Time (hrs/day)"),
-        tooltip=["gender", "mean(daily_social_media_time):Q"]
+        y=alt.Y("mean:Q", title=GENDER_METRICS[metric]),
+        tooltip=[
+            "gender",
+            alt.Tooltip("mean:Q", title=f"Mean of {metric}"),
+            alt.Tooltip("count:Q", title="Responses"),
+            alt.Tooltip("std:Q", title="Std Dev", format=".2f")
+        ]
     ).properties(width=600, height=400).configure_axisX(labelAngle=0)
 
     return chart
 
 
-def chart16(data):
-    plot_data = data[['gender', 'breaks_during_work']].dropna()
+def chart14(data):
+    return gender_mean_chart(data, "actual_productivity_score", "Actual Productivity by Gender")
 
-    chart = alt.Chart(plot_data, title="Breaks During Work by Gender").mark_bar().encode(
-        x=alt.X("gender:N", title="Gender"),
-        y=alt.Y("mean(breaks_during_work):Q", title="Avg Breaks per Day"),
-        tooltip=["gender", "mean(breaks_during_work):Q"]
-    ).properties(width=600, height=400).configure_axisX(labelAngle=0)
 
-    return chart
+def chart15(data):
+    return gender_mean_chart(data, "daily_social_media_time", "Daily Social Media Time by Gender")
+
+
+def chart16(data):
+    return gender_mean_chart(data, "breaks_during_work", "Breaks During Work by Gender")
 
 
 def chart17(data):
-    plot_data = data[['gender', 'social_platform_preference']].dropna()
+    if precomputed(data, "platform_counts"):
+        plot_data = data
+    else:
+        plot_data = data.groupby(['gender', 'social_platform_preference'], observed=True).size().reset_index(name='count')
 
     chart = alt.Chart(plot_data, title="Social Media Preference by Gender").mark_bar().encode(
         x=alt.X("gender:N", title="Gender"),
-        y=alt.Y("count():Q", title="Number of People"),
+        y=alt.Y("count:Q", title="Number of People"),
         color=alt.Color("social_platform_preference:N", title="Preferred Platform"),
-        tooltip=["gender", "social_platform_preference", "count()"]
+        tooltip=["gender", "social_platform_preference", alt.Tooltip("count:Q", title="Count of Records")]
     ).properties(width=600, height=400).configure_axisX(labelAngle=0)
 
     return chart
 
 
 def chart18(data):
-    plot_data = data[['gender', 'stress_level']].dropna()
-
-    chart = alt.Chart(plot_data, title="Stress Level by Gender").mark_bar().encode(
-        x=alt.X("gender:N", title="Gender"),
-        y=alt.Y("mean(stress_level):Q", title="Avg Stress Level"),
-        tooltip=["gender", "mean(stress_level):Q"]
-    ).properties(width=600, height=400).configure_axisX(labelAngle=0)
-
-    return chart
+    return gender_mean_chart(data, "stress_level", "Stress Level by Gender")
 
 
 def chart19(data):
-    plot_data = data[['gender', 'job_satisfaction_score']].dropna()
-
-    chart = alt.Chart(plot_data, title="Job Satisfaction by Gender").mark_bar().encode(
-        x=alt.X("gender:N", title="Gender"),
-        y=alt.Y("mean(job_satisfaction_score):Q", title="Avg Job Satisfaction"),
-        tooltip=["gender", "mean(job_satisfaction_score):Q"]
-    ).properties(width=600, height=400).configure_axisX(labelAngle=0)
-
-    return chart
+    return gender_mean_chart(data, "job_satisfaction_score", "Job Satisfaction by Gender")
 
 
 def chart20(data):
-    plot_data = data[['gender', 'days_feeling_burnout_per_month']].dropna()
-
-    chart = alt.Chart(plot_data, title="Burnout Days per Month by Gender").mark_bar().encode(
-        x=alt.X("gender:N", title="Gender"),
-        y=alt.Y("mean(days_feeling_burnout_per_month):Q", title="Avg Burnout Days/Month"),
-        tooltip=["gender", "mean(days_feeling_burnout_per_month):Q"]
-    ).properties(width=600, height=400).configure_axisX(labelAngle=0)
-
-    return chart
+    return gender_mean_chart(data, "days_feeling_burnout_per_month", "Burnout Days per Month by Gender")
 
 
 def chart21(data):
-    plot_data = data[['gender', 'coffee_consumption_per_day']].dropna()
+    return gender_mean_chart(data, "coffee_consumption_per_day", "Coffee Consumption by Gender")
 
-    chart = alt.Chart(plot_data, title="Coffee Consumption by Gender").mark_bar().encode(
-        x=alt.X("gender:N", title="Gender"),
-        y=alt.Y("mean(coffee_consumption_per_day):Q", title="Avg Cups of Coffee/Day"),
-        tooltip=["gender", "mean(coffee_consumption_per_day):Q"]
-    ).properties(width=600, height=400).configure_axisX(labelAngle=0)
 
-    return chart
+def chart22(data):
+    return gender_mean_chart(data, "weekly_offline_hours", "Weekly Offline Hours by Gender")
 
 
-def chart22(data):
-    plot_data = data[['gender', 'weekly_offline_hours']].dropna()
+def gender_report(data):
+    # Every gender metric on one page, from the same few-row summary as chart14-22
+    plot_data = gender_summary(data)
+    plot_data = plot_data.assign(label=plot_data["metric"].map(GENDER_METRICS))
 
-    chart = alt.Chart(plot_data, title="Weekly Offline Hours by Gender").mark_bar().encode(
-        x=alt.X("gender:N", title="Gender"),
-        y=alt.Y("mean(weekly_offline_hours):Q", title="Avg Offline Hours/Week"),
-        tooltip=["gender", "mean(weekly_offline_hours):Q"]
-    ).properties(width=600, height=400).configure_axisX(labelAngle=0)
+    chart = alt.Chart(plot_data).mark_bar().encode(
+        x=alt.X("gender:N", title=None),
+        y=alt.Y("mean:Q", title=None),
+        color=alt.Color("gender:N", title="Gender"),
+        tooltip=[
+            "gender",
+            alt.Tooltip("label:N", title="Metric"),
+            alt.Tooltip("mean:Q", title="Mean", format=".2f"),
+            alt.Tooltip("count:Q", title="Responses"),
+            alt.Tooltip("std:Q", title="Std Dev", format=".2f"),
+            alt.Tooltip("missing:Q", title="Missing")
+        ]
+    ).properties(width=180, height=180).facet(
+        facet=alt.Facet("label:N", title=None), columns=4, title="Survey Metrics by Gender"
+    ).resolve_scale(y="independent").configure_axisX(labelAngle=0)
 
     return chart
 
@@ -392,7 +430,13 @@ def chart23(data):
     # Sort by notifications for smoother lines
     plot_data = plot_data.sort_values('number_of_notifications')
 
-    chart = alt.Chart(plot_data, title="Notifications vs Actual Productivity (Line Chart)").mark_line(point=True).encode(
+    # With --stream the line runs through the scatter sample, so say so like lod_points does
+    title = "Notifications vs Actual Productivity (Line Chart)"
+    total = population(plot_data, "number_of_notifications", "actual_productivity_score")
+    if len(plot_data) < total:
+        title = approximate_title(title, len(plot_data), total)
+
+    chart = alt.Chart(plot_data, title=title).mark_line(point=True).encode(
         x=alt.X("number_of_notifications:Q", title="Notifications per Day"),
         y=alt.Y("actual_productivity_score:Q", title="Actual Productivity Score"),
         color=alt.Color("social_platform_preference:N", title="Preferred Social Platform"),
@@ -415,8 +459,11 @@ def chart23(data):
 
 def chart24(data):
     plot_data = data[['number_of_notifications', 'actual_productivity_score', 'social_platform_preference']].dropna()
+    plot_data, title = lod_points(plot_data, "number_of_notifications", "actual_productivity_score",
+                                  "Notifications vs Actual Productivity (Scatter Plot)",
+                                  strata="social_platform_preference")
 
-    chart = alt.Chart(plot_data, title="Notifications vs Actual Productivity (Scatter Plot)").mark_circle(size=60, opacity=0.5).encode(
+    chart = alt.Chart(plot_data, title=title).mark_circle(size=60, opacity=0.5).encode(
         x=alt.X("number_of_notifications:Q", title="Notifications per Day"),
         y=alt.Y("actual_productivity_score:Q", title="Actual Productivity Score"),
         color=alt.Color("social_platform_preference:N", title="Preferred Social Platform"),
@@ -435,87 +482,181 @@ def chart24(data):
     return chart
 
 
-
-
-
-
-
-try:
-    with open('social_media_vs_productivity 2.csv', 'r') as file:
-        data = pd.read_csv(file)
-except FileNotFoundError:
-    print("File not found. Please ensure the file path is correct.")
-    sys.exit()
-
-
-visual1 = chart1(data)
-visual1.save('Chart1_Social_Media_vs_Actual_Productivity.html')
-
-visual2 = chart2(data)
-visual2.save('Chart2_Social_Media_vs_Perceived_Productivity.html')
-
-visual3 = chart3(data)
-visual3.save('Chart3_Social_Media_vs_Sleep_and_Stress.html')
-
-visual4 = chart4(data)
-visual4.save('Chart4_Social_Media_vs_Breaks_and_Productivity.html')
-
-visual5 = chart5(data)
-visual5.save('Chart5_Social_Media_vs_Burnout_Days.html')
-
-visual6 = chart6(data)
-visual6.save('Chart6_Social_Media_vs_Breaks_and_Productivity_by_Preference.html')
-
-visual7 = chart7(data)
-visual7.save('Chart7_Perceived_vs_Actual_Productivity.html')
-
-visual8 = chart8(data)
-visual8.save('Chart8_Actual_Productivity_by_Job_Satisfaction.html')
-
-visual9 = chart9(data)
-visual9.save('Chart9_Social_Media_Time_by_Job_Satisfaction.html')
-
-visual10 = chart10(data)
-visual10.save('Chart10_Breaks_per_Day_by_Job_Satisfaction.html')
-
-visual11 = chart11(data)
-visual11.save('Chart11_Productivity_by_Job_Type_and_Social_Media_Time.html')
-
-visual12 = chart12(data)
-visual12.save('Chart12_Social_Media_Time_by_Job_Satisfaction_Binned_Deep.html')
-
-visual13 = chart13(data)
-visual13.save('Chart13_Notifications_by_Social_Media_Platform.html')
-
-visual14 = chart14(data)
-visual14.save("Chart14_Gender_vs_Actual_Productivity.html")
-
-visual15 = chart15(data)
-visual15.save("Chart15_Gender_vs_Social_Media_Time.html")
-
-visual16 = chart16(data)
-visual16.save("Chart16_Gender_vs_Breaks_During_Work.html")
-
-visual17 = chart17(data)
-visual17.save("Chart17_Gender_vs_Social_Media_Preference.html")
-
-visual18 = chart18(data)
-visual18.save("Chart18_Gender_vs_Stress_Level.html")
-
-visual19 = chart19(data)
-visual19.save("Chart19_Gender_vs_Job_Satisfaction.html")
-
-visual20 = chart20(data)
-visual20.save("Chart20_Gender_vs_Burnout_Days.html")
-
-visual21 = chart21(data)
-visual21.save("Chart21_Gender_vs_Coffee_Consumption.html")
-
-visual22 = chart22(data)
-visual22.save("Chart22_Gender_vs_Weekly_Offline_Hours.html")
-
-visual23 = chart23(data)
-visual23.save("Chart23_Notifications_by_Platform_Line.html")
-
-visual24 = chart24(data)
-visual24.save("Chart24_Notifications_by_Platform_Scatter.html")
+# Chart builders and the HTML file each one is saved to
+CHARTS = {
+    "chart1": (chart1, "Chart1_Social_Media_vs_Actual_Productivity.html"),
+    "chart2": (chart2, "Chart2_Social_Media_vs_Perceived_Productivity.html"),
+    "chart3": (chart3, "Chart3_Social_Media_vs_Sleep_and_Stress.html"),
+    "chart4": (chart4, "Chart4_Social_Media_vs_Breaks_and_Productivity.html"),
+    "chart5": (chart5, "Chart5_Social_Media_vs_Burnout_Days.html"),
+    "chart6": (chart6, "Chart6_Social_Media_vs_Breaks_and_Productivity_by_Preference.html"),
+    "chart7": (chart7, "Chart7_Perceived_vs_Actual_Productivity.html"),
+    "chart8": (chart8, "Chart8_Actual_Productivity_by_Job_Satisfaction.html"),
+    "chart9": (chart9, "Chart9_Social_Media_Time_by_Job_Satisfaction.html"),
+    "chart10": (chart10, "Chart10_Breaks_per_Day_by_Job_Satisfaction.html"),
+    "chart11": (chart11, "Chart11_Productivity_by_Job_Type_and_Social_Media_Time.html"),
+    "chart12": (chart12, "Chart12_Social_Media_Time_by_Job_Satisfaction_Binned_Deep.html"),
+    "chart13": (chart13, "Chart13_Notifications_by_Social_Media_Platform.html"),
+    "chart14": (chart14, "Chart14_Gender_vs_Actual_Productivity.html"),
+    "chart15": (chart15, "Chart15_Gender_vs_Social_Media_Time.html"),
+    "chart16": (chart16, "Chart16_Gender_vs_Breaks_During_Work.html"),
+    "chart17": (chart17, "Chart17_Gender_vs_Social_Media_Preference.html"),
+    "chart18": (chart18, "Chart18_Gender_vs_Stress_Level.html"),
+    "chart19": (chart19, "Chart19_Gender_vs_Job_Satisfaction.html"),
+    "chart20": (chart20, "Chart20_Gender_vs_Burnout_Days.html"),
+    "chart21": (chart21, "Chart21_Gender_vs_Coffee_Consumption.html"),
+    "chart22": (chart22, "Chart22_Gender_vs_Weekly_Offline_Hours.html"),
+    "chart23": (chart23, "Chart23_Notifications_by_Platform_Line.html"),
+    "chart24": (chart24, "Chart24_Notifications_by_Platform_Scatter.html"),
+    "gender_report": (gender_report, "Chart14-22_Gender_Report.html"),
+}
+
+DATA_FILE = 'social_media_vs_productivity 2.csv'
+
+
+def load_data():
+    try:
+        with open(DATA_FILE, 'r') as file:
+            data = load_compact(file, SOCIAL_MEDIA_SCHEMA)
+        # Ranges, bin edges and percentile cuts come from the cached sketches, not extra scans
+        return attach(data, cached_sketch(DATA_FILE, data))
+    except FileNotFoundError:
+        print("File not found. Please ensure the file path is correct.")
+        sys.exit()
+
+
+# --stream: width of the cells that stand in for rows when bin edges depend on the whole file
+CELL_WIDTH = 0.001
+
+# Columns of the sample behind the scatter plots (chart1, 2, 4, 7, 24) and chart23
+SAMPLE_COLUMNS = [
+    "daily_social_media_time", "actual_productivity_score", "perceived_productivity_score",
+    "breaks_during_work", "number_of_notifications", "social_platform_preference",
+]
+
+# (x, y, rows must also have) of every sampled chart, for its "approximate: n of N points" title
+SAMPLED_PAIRS = [
+    ("daily_social_media_time", "actual_productivity_score", ()),
+    ("daily_social_media_time", "perceived_productivity_score", ()),
+    ("perceived_productivity_score", "actual_productivity_score", ()),
+    ("number_of_notifications", "actual_productivity_score", ("social_platform_preference",)),
+]
+
+
+def stream_inputs(path, chunk_rows=CHUNK_ROWS):
+    """Every chart's input from one chunked pass over the survey CSV, for files too big to load.
+
+    Memory depends on the number of groups and cells, not on the file size. Each chart gets
+    a small stand-in frame: one row per group holding the group's means (so the chart's own
+    mean() aggregates draw the same bars), its finished table (gender summary, chart17's
+    counts), or for the scatter plots a reservoir sample per platform that lod_points thins
+    as usual. Every stand-in carries the file's TableSketch, so ranges and percentile
+    cuts are whole-file ones.
+
+    Binned charts are exact up to CELL_WIDTH: rows are grouped by cell while reading and
+    each cell joins the bin its centre falls in once the range is known.
+    Returns {chart name: frame}.
+    """
+    satisfaction, social = "job_satisfaction_score", "daily_social_media_time"
+    sketch = TableSketch()
+    present = PresentCounts([(x, y) + extra for x, y, extra in SAMPLED_PAIRS])
+    sample = Reservoir(SAMPLE_COLUMNS, MAX_POINTS, strata="social_platform_preference")
+    sleep = GroupMoments(metrics=["screen_time_before_sleep", "stress_level"], cells={"sleep_hours": CELL_WIDTH})
+    burnout = GroupMoments(["days_feeling_burnout_per_month"], [social])
+    breaks = GroupMoments(["breaks_during_work", "social_platform_preference"], ["actual_productivity_score"])
+    by_satisfaction = GroupMoments(metrics=["actual_productivity_score", social, "breaks_during_work"],
+                                   cells={satisfaction: CELL_WIDTH})
+    # chart12 needs satisfaction x social media time; the time cells are what its percentile cut keeps or drops
+    social_cells = GroupMoments(metrics=[social], cells={satisfaction: CELL_WIDTH, social: 0.01})
+    job = GroupMoments(["job_type"], ["actual_productivity_score", social], where=["actual_productivity_score", social])
+    notifications = GroupMoments(["social_platform_preference"], ["number_of_notifications"])
+    gender = GroupMoments(["gender"], list(GENDER_METRICS))
+    platforms = GroupMoments(["gender", "social_platform_preference"])
+
+    # Same numeric dtypes as load_data; text stays plain so chunks never disagree on categories
+    schema = {name: dtype for name, dtype in SOCIAL_MEDIA_SCHEMA.items() if dtype != "category"}
+    scan_csv(path, [sketch, present, sample, sleep, burnout, breaks, by_satisfaction, social_cells,
+                     job, notifications, gender, platforms],
+             chunk_rows, prepare=lambda chunk: compact_frame(chunk, schema, infer=False))
+
+    # Job satisfaction cells take the label pd.cut gives their centre over the full range
+    low, high = sketch[satisfaction].range()
+    def satisfaction_bins(codes):
+        centres = np.clip(by_satisfaction.cell_mids(satisfaction, codes), low, high)
+        frame = pd.DataFrame({satisfaction: np.concatenate([[low, high], centres])})
+        return FEATURES["job_satisfaction_bin"].compute(frame).to_numpy()[2:]
+
+    # Sleep cells stand in at the centre of the Vega bin they fall in; rows at the min and
+    # max (without metrics) give the chart's bin transform the file's extent
+    sleep_low, sleep_high = sketch["sleep_hours"].range()
+    start, stop, step = bin_params((sleep_low, sleep_high), maxbins=10)
+    def sleep_bins(codes):
+        centres = np.clip(sleep.cell_mids("sleep_hours", codes), max(sleep_low, start), min(sleep_high, stop - step))
+        return start + step * (np.floor(1e-14 + (centres - start) / step) + 0.5)
+
+    # chart12 drops rows outside the 5th-95th percentile of social media time
+    cells = social_cells.summary()
+    cells = cells[cells["mean"].between(*sketch[social].quantiles([0.05, 0.95]))]
+    cells = cells.assign(job_satisfaction_bin=satisfaction_bins(cells[satisfaction]),
+                         total=cells["mean"] * cells["count"])
+    trimmed = cells.groupby("job_satisfaction_bin", observed=True)[["total", "count"]].sum()
+    trimmed = pd.DataFrame({"job_satisfaction_bin": trimmed.index,
+                            social: (trimmed["total"] / trimmed["count"]).to_numpy()})
+
+    points = sample.rows()
+    points.attrs["population"] = {f"{x}|{y}": present.counts[(x, y) + extra] for x, y, extra in SAMPLED_PAIRS}
+    satisfaction_means = by_satisfaction.means({satisfaction: satisfaction_bins}).rename(
+        columns={satisfaction: "job_satisfaction_bin"})
+
+    # The gender charts (14-16, 18-22 and the report) all read the summary
+    summary = gender.summary()
+    inputs = dict.fromkeys(CHARTS, summary)
+    inputs.update(dict.fromkeys(["chart1", "chart2", "chart4", "chart7", "chart23", "chart24"], points))
+    inputs.update(dict.fromkeys(["chart8", "chart9", "chart10"], satisfaction_means))
+    inputs.update({
+        "chart3": pd.concat([sleep.means({"sleep_hours": sleep_bins}),
+                             pd.DataFrame({"sleep_hours": [sleep_low, sleep_high]})], ignore_index=True),
+        "chart5": burnout.means(),
+        "chart6": breaks.means(),
+        "chart11": job.means(),
+        "chart12": trimmed,
+        "chart13": notifications.means(),
+        "chart17": platforms.sizes(),
+    })
+    for name, frame in inputs.items():
+        table = "gender_summary" if frame is summary else "platform_counts" if name == "chart17" else None
+        frame.attrs[STREAM_ATTR] = table
+        attach(frame, sketch)
+    return inputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Save the term project charts as HTML.")
+    parser.add_argument("--external-data", action="store_true",
+                        help="Write each dataset once to data/ and have the HTML files load it by URL")
+    parser.add_argument("--stream", action="store_true",
+                        help="Aggregate the CSV chunk by chunk instead of loading it, for files larger than memory")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                        help="Rows per chunk with --stream")
+    args = parser.parse_args()
+
+    if args.stream:
+        if not os.path.exists(DATA_FILE):
+            print("File not found. Please ensure the file path is correct.")
+            sys.exit()
+        inputs = stream_inputs(DATA_FILE, args.chunk_rows)
+        # Every chart embeds its aggregated data, so the specs alone tell what changed
+        manifest = BuildManifest(".", None, shared_data=args.external_data)
+    else:
+        data = load_data()
+        inputs = dict.fromkeys(CHARTS, data)
+        # Only rewrite charts whose data, spec or save options changed since the last run
+        manifest = BuildManifest(".", data, shared_data=args.external_data)
+    for name, (chart_function, filename) in CHARTS.items():
+        visual = chart_function(inputs[name])
+        manifest.save(visual, filename)
+    manifest.finish()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,13 @@
 import altair as alt
 import pandas as pd
+import argparse
 import os
+import sys
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.build_manifest import BuildManifest
+
 def visualization1(data):
     chart = alt.Chart(data, title="Income vs. Life Expectancy (OECD, 2014)").mark_circle(size=60).encode(
         x=alt.X('LifeExpectancy:Q', title='Life Expectancy (Years)'),
@@ -103,14 +108,25 @@ try:
 except FileNotFoundError:
     print("File not found. Please ensure the file path is correct.")
 
+parser = argparse.ArgumentParser(description="Save the OECD charts as HTML.")
+parser.add_argument("--external-data", action="store_true",
+                    help="Write each dataset once to data/ and have the HTML files load it by URL")
+args = parser.parse_args()
+
+# Only rewrite charts whose data, spec or save options changed since the last run,
+# with their filters and aggregates computed here so each file embeds the reduced rows
+manifest = BuildManifest('.', data, shared_data=args.external_data, pushdown=True)
+
 visual = visualization1(data)
-visual.save('week2Chart1.html')
+manifest.save(visual, 'week2Chart1.html')
 
 visual = visualization2(data)
-visual.save('week2Chart2.html')
+manifest.save(visual, 'week2Chart2.html')
 
 visual = visualization3(data)
-visual.save('week2Chart3.html')
+manifest.save(visual, 'week2Chart3.html')
 
 visual = visualization4(data)
-visual.save('week2Chart4.html')
\ No newline at end of file
+manifest.save(visual, 'week2Chart4.html')
+
+manifest.finish()
@@ -1,8 +1,12 @@
 import altair as alt
 import pandas as pd
 import os
+import sys
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.build_manifest import BuildManifest
+
 
 def visualization1(data):
 
@@ -141,14 +145,20 @@ except FileNotFoundError:
     print("File not found. Please ensure the file path is correct.")
 
 
+# Only rewrite charts whose data, spec or save options changed since the last run,
+# with their filters and aggregates computed here so each file embeds the reduced rows
+manifest = BuildManifest('.', data, pushdown=True)
+
 visual = visualization1(data)
-visual.save('visualization1.html')
+manifest.save(visual, 'visualization1.html')
 
 visual = visualization2(data)
-visual.save('visualization2.html')
+manifest.save(visual, 'visualization2.html')
 
 visual = visualization3(data)
-visual.save('visualization3.html')
+manifest.save(visual, 'visualization3.html')
 
 visual = visualization4(data)
-visual.save('visualization4.html')
\ No newline at end of file
+manifest.save(visual, 'visualization4.html')
+
+manifest.finish()
@@ -1,9 +1,17 @@
 import altair as alt
 import pandas as pd
+import argparse
 import sys
 import os
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.data_cube import build_cube
+from common.lod import MAX_POINTS
+
+# Bins of the precomputed cube: the histogram's 10 and a finer grid for the scatter
+CUBE_BINS = {"LifeExpectancy": 10, "Income": 40}
+
 
 def interactive_visualization(data):
     # Selections
@@ -54,11 +62,82 @@ def interactive_visualization(data):
     return alt.vconcat(histogram, scatter).configure_title(anchor="start")
 
 
+def cube_visualization(data):
+    """The same linked histogram and scatter, drawn from a precomputed data cube.
+
+    Counts per Region x LifeExpectancy bin x Income bin are computed here, so the
+    page carries one row per occupied cell instead of one per country-year, and
+    brushing or toggling a region re-filters the cells rather than the raw rows.
+    The scatter shows each cell as a circle sized by its count; single countries
+    can't be picked in this mode.
+    """
+    cube = build_cube(data, categories=["Region"], bins=CUBE_BINS)
+
+    # Selections
+    region_select = alt.selection_point(fields=["Region"], bind="legend", toggle=True)
+    brush_select = alt.selection_interval(encodings=["x"])
+    hover = alt.selection_point(on="mouseover", encodings=["x"], empty="none")
+
+    # Histogram over the cube's LifeExpectancy bins
+    histogram = alt.Chart(cube).mark_bar().encode(
+        x=alt.X("LifeExpectancy_start:Q", bin="binned", title="Life Expectancy (years)"),
+        x2="LifeExpectancy_end:Q",
+        y=alt.Y("sum(count):Q", title="Number of Countries"),
+        color=alt.condition(hover, alt.value("gold"), alt.Color("Region:N", title="Region")),
+        opacity=alt.condition(brush_select, alt.value(1), alt.value(0.3)),
+        tooltip=["Region:N", alt.Tooltip("sum(count):Q", title="Number of Countries")]
+    ).add_params(
+        region_select,
+        brush_select,
+        hover
+    ).transform_filter(
+        region_select
+    ).properties(
+        width=600,
+        height=200,
+        title="Life Expectancy by Region"
+    )
+
+    # Binned scatter: one circle per Region and cell, linked through the same bin fields
+    scatter = alt.Chart(cube).mark_circle(opacity=0.7).encode(
+        x=alt.X("Income_mid:Q", title="Income per Capita (USD)", scale=alt.Scale(domain="unaggregated")),
+        y=alt.Y("LifeExpectancy_mid:Q", title="Life Expectancy (Years)", scale=alt.Scale(domain="unaggregated")),
+        color=alt.Color("Region:N"),
+        size=alt.Size("count:Q", title="Countries", scale=alt.Scale(range=[30, 600])),
+        tooltip=[
+            "Region:N",
+            alt.Tooltip("Income_start:Q", title="Income from"),
+            alt.Tooltip("Income_end:Q", title="Income to"),
+            alt.Tooltip("LifeExpectancy_start:Q", title="Life Expectancy from"),
+            alt.Tooltip("LifeExpectancy_end:Q", title="Life Expectancy to"),
+            alt.Tooltip("count:Q", title="Countries")
+        ],
+        opacity=alt.condition(region_select, alt.value(0.7), alt.value(0.1))
+    ).transform_filter(
+        region_select
+    ).transform_filter(
+        brush_select
+    ).properties(
+        width=600,
+        height=400,
+        title=f"Income vs Life Expectancy (binned: {len(data):,} rows in {len(cube):,} cells)"
+    ).interactive()
+
+    return alt.vconcat(histogram, scatter).configure_title(anchor="start")
+
+
+
 
 
+parser = argparse.ArgumentParser(description="Save the linked life expectancy charts as HTML.")
+parser.add_argument("--data", default='oecd-wealth-health-2014 (1).csv',
+                    help="CSV with Region, Country, LifeExpectancy and Income columns (e.g. a country-by-year panel)")
+parser.add_argument("--mode", choices=["auto", "rows", "cube"], default="auto",
+                    help=f"Inline every row, draw from a binned data cube, or pick by size (cube above {MAX_POINTS:,} rows)")
+args = parser.parse_args()
 
 try:
-    with open('oecd-wealth-health-2014 (1).csv', 'r') as file:
+    with open(args.data, 'r') as file:
         data = pd.read_csv(file)
         alt.data_transformers.enable('default', max_rows=None)
 except FileNotFoundError:
@@ -66,5 +145,8 @@ except FileNotFoundError:
     sys.exit()
 
 
-chart = interactive_visualization(data)
+if args.mode == "cube" or (args.mode == "auto" and len(data) > MAX_POINTS):
+    chart = cube_visualization(data)
+else:
+    chart = interactive_visualization(data)
 chart.save('interactive_visualization.html')
\ No newline at end of file
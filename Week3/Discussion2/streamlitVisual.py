@@ -1,41 +1,107 @@
 import streamlit as st
 import altair as alt
-import pandas as pd
 import os
+import sys
 
 # Set working directory
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.chart_data import prune_chart_data
+from common.instrumentation import start_profiler, tracked_cache
+from common.listings_backend import default_backend, make_filters, open_backend
+from common.listings_cache import resolve_source
+from common.listings_store import ListingsStore, merge_bounds
+from common.lod import MAX_POINTS, approximate_title, sample_points
+
+LISTINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "listings.csv")
+
+# Multi-city store built with `python -m common.listings_store`; listings.csv is used while it is empty
+LISTINGS_STORE = os.environ.get("LISTINGS_STORE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "listings_store"))
+
+# Scatter candidates fetched from the backend before the LOD sample picks MAX_POINTS of them
+CANDIDATE_POINTS = 10 * MAX_POINTS
+
+
+@st.cache_resource
+def get_store(root):
+    return ListingsStore(root)
+
+
+@st.cache_resource
+def get_backend(name, sources, version):
+    # version keys the cache on the data, so an updated snapshot opens a new backend
+    return open_backend(list(sources), name)
+
+
+@tracked_cache(st.cache_data)
+def get_bounds(_backend, _partitions, dataset):
+    """Widget bounds, computed once per dataset (backend name, sources, version) rather than per rerun."""
+    return merge_bounds(_partitions) if _partitions else _backend.bounds()
+
+
+@tracked_cache(st.cache_data, max_entries=256)
+def run_query(_backend, dataset, method, filters, args=()):
+    """A backend aggregate, cached on the dataset and the filters it depends on."""
+    return getattr(_backend, method)(filters, *args)
+
+
+# Each cached point set holds up to CANDIDATE_POINTS rows and every hit unpickles a copy,
+# so only the last few filter states are kept, and not for long
+@tracked_cache(st.cache_data, max_entries=8, ttl=600)
+def run_points_query(_backend, dataset, filters, args=()):
+    return _backend.points(filters, *args)
+
+
+def default_range(bounds, default):
+    """The default slider range, clamped to what the selected snapshot holds."""
+    low, high = bounds
+    return min(max(default[0], low), high), max(min(default[1], high), low)
+
+
 # Main Streamlit app
 st.title("Inside Airbnb: Interactive Data Dashboard")
 
-# Load and clean data
+# Timing spans and the sidebar profile panel are only active with ?profile=1
+profiler = start_profiler()
+
+# Filters and aggregations run in the query backend (DuckDB over the columnar cache by default,
+# LISTINGS_BACKEND=pandas for the in-memory path); the charts only receive result sets
+backend = None
+partitions = []
+store = get_store(LISTINGS_STORE)
 try:
-    data = pd.read_csv("listings.csv")
-    data['price'] = data['price'].replace('[\$,]', '', regex=True).astype(float)
-    data = data.dropna(subset=['price', 'beds', 'estimated_occupancy_l365d', 'neighbourhood_cleansed'])
-    data['beds'] = data['beds'].astype(int)
-    data['estimated_occupancy_l365d'] = data['estimated_occupancy_l365d'].astype(float)
+    if store.partitions():
+        st.sidebar.header("Listings Snapshot")
+        city = st.sidebar.selectbox("City", store.cities())
+        snapshots = store.snapshots(city)
+        snapshot = st.sidebar.selectbox("Snapshot", snapshots, index=len(snapshots) - 1)
+        # Only the selected partition is read; its catalog statistics give the widget bounds
+        partitions = store.select(cities=[city], snapshots=[snapshot])
+        with profiler.span("open backend"):
+            dataset = (default_backend(), tuple(p.path for p in partitions), store.version())
+            backend = get_backend(*dataset)
+    else:
+        with profiler.span("open backend"):
+            dataset = (default_backend(), (LISTINGS_PATH,), os.path.getmtime(resolve_source(LISTINGS_PATH)))
+            backend = get_backend(*dataset)
+    bounds = get_bounds(backend, partitions, dataset)
 except FileNotFoundError:
     st.error("File not found. Please ensure the file path is correct.")
-    data = pd.DataFrame()
 
 # Visualization 1: Estimated Occupancy vs. Number of Beds
 def visualization1(data):
+    # data: beds, avg_occupancy
     chart = alt.Chart(data, title="Estimated Occupancy vs. Number of Beds (Guest Preference)").mark_bar(size=20).encode(
         x=alt.X('beds:Q', title='Number of Beds'),
         y=alt.Y('avg_occupancy:Q', title='Estimated Occupancy (Last 365 Days)')
-    ).transform_aggregate(
-        avg_occupancy='mean(estimated_occupancy_l365d):Q',
-        groupby=['beds']
     ).properties(width=600, height=400)
     return chart
 
 # Visualization 2: Most Popular Number of Beds by Host
 def visualization2(data):
-    bars = alt.Chart(data, title="Listings Count by Number of Beds (Host Preference)").transform_aggregate(
-        count='count()', groupby=['beds']
-    ).mark_bar(size=20).encode(
+    # data: beds, count
+    bars = alt.Chart(data, title="Listings Count by Number of Beds (Host Preference)").mark_bar(size=20).encode(
         x=alt.X('beds:Q', title='Number of Beds'),
         y=alt.Y('count:Q', title='Listing Count'),
         color=alt.Color('beds:N'),
@@ -45,9 +111,8 @@ def visualization2(data):
 
 # Visualization 3: Pie Chart of Listings by Room Type
 def visualization3(data):
-    chart = alt.Chart(data, title="Distribution of Listings by Room Type").transform_aggregate(
-        count='count()', groupby=['room_type']
-    ).mark_arc().encode(
+    # data: room_type, count
+    chart = alt.Chart(data, title="Distribution of Listings by Room Type").mark_arc().encode(
         theta=alt.Theta(field="count", type="quantitative"),
         color=alt.Color(field="room_type", type="nominal", title="Room Type"),
         tooltip=["room_type:N", "count:Q"]
@@ -55,8 +120,28 @@ def visualization3(data):
     return chart
 
 # Visualization 4: Scatter Plot of Price vs Estimated Occupancy
-def visualization4(data):
-    chart = alt.Chart(data, title='Price (USD) vs. Estimated Occupancy').mark_circle(size=60).encode(
+def visualization4(query, filters, mode="sample"):
+    # query(method, filters, args) runs a backend method, e.g. run_query bound to the backend
+    title = 'Price (USD) vs. Estimated Occupancy'
+    total = query("count", filters)
+    if mode == "density" and total > MAX_POINTS:
+        # Binned counts instead of one mark per listing
+        grid = query("density_grid", filters, ('price', 'estimated_occupancy_l365d'))
+        return alt.Chart(grid, title=f"{title} (approximate: density of {total:,} listings)").mark_rect().encode(
+            x=alt.X('price_start:Q', title='Price (USD)'),
+            x2='price_end:Q',
+            y=alt.Y('estimated_occupancy_l365d_start:Q', title='Estimated Occupancy (Last 365 Days)'),
+            y2='estimated_occupancy_l365d_end:Q',
+            color=alt.Color('count:Q', title='Listings', scale=alt.Scale(scheme='blues')),
+            tooltip=['count:Q']
+        ).properties(width=700, height=400)
+
+    # Sample above the LOD threshold, keeping every bed count and the outliers
+    candidates = query("points", filters, (CANDIDATE_POINTS,))
+    data, approximate = sample_points(candidates, 'price', 'estimated_occupancy_l365d', strata='beds')
+    if approximate or len(data) < total:
+        title = approximate_title(title, len(data), total)
+    chart = alt.Chart(data, title=title).mark_circle(size=60).encode(
         x=alt.X('price:Q', title='Price (USD)'),
         y=alt.Y('estimated_occupancy_l365d:Q', title='Estimated Occupancy (Last 365 Days)'),
         color=alt.Color('beds:N', title='Beds'),
@@ -64,39 +149,74 @@ def visualization4(data):
     ).properties(width=700, height=400)
     return chart
 
-if not data.empty:
+
+# The sidebar filters feed every chart, so changing one reruns the script; controls that only
+# affect one chart live in that chart's fragment, which reruns on its own
+def summary_charts(query, filters):
+    with profiler.span(f"query ({backend.name})"):
+        results = {
+            "occupancy by beds": query("occupancy_by_beds", filters),
+            "listings by beds": query("count_by_beds", filters),
+            "room types": query("count_by_room_type", filters),
+        }
+    # Each chart only embeds the columns it encodes
+    with profiler.span("build charts"):
+        charts = {
+            "occupancy by beds": prune_chart_data(visualization1(results["occupancy by beds"])),
+            "listings by beds": prune_chart_data(visualization2(results["listings by beds"])),
+            "room types": prune_chart_data(visualization3(results["room types"])),
+        }
+    for name, chart in charts.items():
+        profiler.altair_chart(name, chart, use_container_width=True)
+
+
+@st.fragment
+def scatter_chart(query, filters):
+    # A rerun of just this fragment never reaches the sidebar panel, so it keeps its own profile
+    profiler = start_profiler()
+    mode = st.radio(
+        "Large Scatter Rendering", ["sample", "density"], horizontal=True, key="scatter_mode",
+        format_func={"sample": "Sampled points", "density": "Density heatmap"}.get,
+        help=f"Used when more than {MAX_POINTS:,} listings match the filters."
+    )
+    with profiler.span("build scatter"):
+        chart = prune_chart_data(visualization4(query, filters, mode))
+    profiler.altair_chart("price vs occupancy", chart, use_container_width=True)
+    profiler.render_panel(st, title="Scatter profile")
+
+if backend is not None:
     # Sidebar filters
     st.sidebar.header("Filter Listings")
 
-    min_beds = int(data['beds'].min())
-    max_beds = int(data['beds'].max())
-    beds_selected = st.sidebar.slider("Number of Beds", min_beds, max_beds, (1, 4))
+    min_beds, max_beds = bounds['beds']
+    beds_selected = st.sidebar.slider("Number of Beds", min_beds, max_beds,
+                                      default_range(bounds['beds'], (1, 4)))
 
-    min_price = int(data['price'].min())
-    max_price = int(data['price'].max())
-    price_selected = st.sidebar.slider("Price Range ($)", min_price, min(1000, max_price), (50, 300))
+    min_price, max_price = bounds['price']
+    price_selected = st.sidebar.slider("Price Range ($)", min_price, min(1000, max_price),
+                                       default_range((min_price, min(1000, max_price)), (50, 300)))
 
-    occupancy_selected = st.sidebar.slider("Estimated Occupancy (last 365 days)", 0, int(data['estimated_occupancy_l365d'].max()), (0, 200))
+    occupancy_selected = st.sidebar.slider("Estimated Occupancy (last 365 days)", *bounds['occupancy'],
+                                           default_range(bounds['occupancy'], (0, 200)))
 
     neighborhoods = st.sidebar.multiselect(
         "Select Neighborhoods",
-        sorted(data['neighbourhood_cleansed'].unique()),
-        default=sorted(data['neighbourhood_cleansed'].unique())[:10]
+        bounds['neighbourhoods'],
+        default=bounds['neighbourhoods'][:10]
     )
 
-    # Filter data
-    data_filtered = data[
-        (data['beds'] >= beds_selected[0]) & (data['beds'] <= beds_selected[1]) &
-        (data['price'] >= price_selected[0]) & (data['price'] <= price_selected[1]) &
-        (data['estimated_occupancy_l365d'] >= occupancy_selected[0]) &
-        (data['estimated_occupancy_l365d'] <= occupancy_selected[1]) &
-        (data['neighbourhood_cleansed'].isin(neighborhoods))
-    ]
+    filters = make_filters(beds_selected, price_selected, occupancy_selected, neighborhoods)
 
     # Display visualizations
-    st.altair_chart(visualization1(data_filtered), use_container_width=True)
-    st.altair_chart(visualization2(data_filtered), use_container_width=True)
-    st.altair_chart(visualization3(data_filtered), use_container_width=True)
-    st.altair_chart(visualization4(data_filtered), use_container_width=True)
+    # Query results are cached per dataset and filters, so a rerun that leaves them unchanged skips the backend
+    def query(method, filters, args=()):
+        if method == "points":
+            return run_points_query(backend, dataset, filters, args)
+        return run_query(backend, dataset, method, filters, args)
+
+    summary_charts(query, filters)
+    scatter_chart(query, filters)
 
     st.caption("Data source: Inside Airbnb")
+
+profiler.render_panel()
@@ -1,35 +1,82 @@
 import streamlit as st
-import pandas as pd
 import altair as alt
-import numpy as np  # <-- add this import
-# import os
+import os
+import sys
 
 # # Ensure current working directory is set correctly
 # os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
-# Load the data
-df = pd.read_csv("bacteria_timeline_tableau.csv")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.derived import neg_log10
+from common.tail_reader import CSVTail
+
+DATA_PATH = "bacteria_timeline_tableau.csv"
 
 # Optional: Set MIC to log-scale for better visual scaling (larger size = more effective)
-df["log_MIC"] = df["MIC"].apply(lambda x: None if x <= 0 else round(-1 * np.log10(x), 2))  # <-- fixed here
-
-# Create chart
-chart = alt.Chart(df).mark_circle().encode(
-    x=alt.X('Order:O', title='Testing Order'),
-    y=alt.Y('Bacteria:N', sort=alt.EncodingSortField(field='Order', order='ascending')),
-    color=alt.Color('Antibiotic:N', scale=alt.Scale(scheme='category10')),
-    size=alt.Size('log_MIC:Q', title='-log10(MIC)', scale=alt.Scale(range=[50, 300])),
-    tooltip=['Bacteria', 'Antibiotic', 'MIC', 'Gram_Staining']
-).properties(
-    width=800,
-    height=600,
-    title='Antibiotic Effectiveness Timeline by Bacteria (Inverse MIC)'
-).configure_axis(
-    grid=True
-).configure_title(
-    fontSize=18,
-    anchor='start'
-)
-
-st.altair_chart(chart, use_container_width=True)
+FEATURES = {
+    "log_MIC": neg_log10("MIC", decimals=2),
+}
+
+
+# One reader per file, shared by every session; each refresh parses only the rows appended since the last
+@st.cache_resource
+def load_data(path):
+    return CSVTail(path, FEATURES)
+
+
+def timeline_chart(df):
+    return alt.Chart(df).mark_circle().encode(
+        x=alt.X('Order:O', title='Testing Order'),
+        y=alt.Y('Bacteria:N', sort=alt.EncodingSortField(field='Order', order='ascending')),
+        color=alt.Color('Antibiotic:N', scale=alt.Scale(scheme='category10')),
+        size=alt.Size('log_MIC:Q', title='-log10(MIC)', scale=alt.Scale(range=[50, 300])),
+        tooltip=['Bacteria', 'Antibiotic', 'MIC', 'Gram_Staining']
+    ).properties(
+        width=800,
+        height=600,
+        title='Antibiotic Effectiveness Timeline by Bacteria (Inverse MIC)'
+    ).configure_axis(
+        grid=True
+    ).configure_title(
+        fontSize=18,
+        anchor='start'
+    )
+
+
+tail = load_data(DATA_PATH)
+COLUMNS = ["Bacteria", "Antibiotic", "MIC", "Gram_Staining", "Order", "log_MIC"]
+
+# The chart shows at most the latest TIMELINE_ROWS results, so what is sent per redraw
+# does not grow with the file
+TIMELINE_ROWS = 5000
+
+# Follow mode polls the file on a timer and re-runs the app only when results were appended
+follow = st.sidebar.toggle("Follow new results", help=f"Watch {DATA_PATH} for appended rows")
+interval = st.sidebar.number_input("Refresh every (seconds)", min_value=1, value=5, disabled=not follow)
+
+
+@st.fragment(run_every=interval if follow else None)
+def watch():
+    # A tick with nothing new costs one stat() and sends nothing. The reader is shared, so
+    # each session compares against the version its chart was drawn from
+    tail.refresh()
+    if follow and tail.version() != st.session_state.get("timeline_version"):
+        st.rerun()
+
 
+tail.refresh()
+version = tail.version()
+df = tail.window(TIMELINE_ROWS)
+total = df.index.stop if len(df) else 0
+if df.empty:
+    st.info(f"Waiting for results in {DATA_PATH}.")
+else:
+    st.altair_chart(timeline_chart(df[COLUMNS]), use_container_width=True, key="timeline")
+if total > len(df):
+    st.caption(f"Showing the latest {len(df):,} of {total:,} results")
+if follow:
+    added = total - st.session_state.get("timeline_rows", total)
+    st.caption(f"{total:,} results, {max(added, 0):,} new since the last refresh")
+st.session_state["timeline_version"] = version
+st.session_state["timeline_rows"] = total
+watch()
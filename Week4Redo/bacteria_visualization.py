@@ -2,73 +2,83 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.instrumentation import start_profiler, tracked_cache
+from common.mic_matrix import MICMatrix
+from common.windowing import group_counts, group_rows, page_count, search, window
+
+BEST_VIEW = "Most Effective Across All"
+
+VIEW_TITLES = {
+    BEST_VIEW: "Comprehensive Antibiotic Arsenal: Our Best Weapons Against Common Bacterial Threats",
+    "Penicillin": "Penicillin: The Gold Standard Against Gram-Positive Bacterial Infections",
+    "Neomycin": "Neomycin: Highly Effective Broad-Spectrum Agent, Particularly Against Gram-Negative Bacteria",
+    "Streptomycin": "Streptomycin: A Valuable Alternative with Selective Effectiveness Across Bacterial Species",
+}
+
+# Bars per chart page; only the visible page is sent to the browser
+PAGE_SIZE = 25
+
+# Grouping label -> column
+GROUPINGS = {
+    "No grouping": None,
+    "Genus": "Genus",
+    "Gram stain": "Gram_Staining",
+}
 
 # Cache data loading for better performance
-@st.cache_data
+@tracked_cache(st.cache_resource)
 def load_and_process_data():
-    """Load and preprocess the bacteria antibiotics data."""
+    """Load the bacteria antibiotics data as a strain x antibiotic MIC matrix."""
     df = pd.read_csv("./bacteriaWithSpacer.csv")
     
     # Remove spacer rows
-    df = df[df["Bacteria"] != "---"].copy()
-    
-    # Store the original order from CSV (excluding spacer)
-    original_order = df["Bacteria"].tolist()
+    df = df[df["Bacteria"] != "---"]
     
-    # Melt to long format
-    df_long = df.melt(
-        id_vars=["Bacteria", "Gram_Staining", "Genus"],
-        value_vars=["Penicillin", "Streptomycin", "Neomycin"],
-        var_name="Antibiotic", 
-        value_name="MIC"
-    )
-    
-    # Compute effectiveness
-    df_long["Effectiveness"] = -np.log10(df_long["MIC"])
-    
-    return df_long, original_order
+    # Every antibiotic column in the file; rows keep the original CSV order
+    return MICMatrix.from_wide(df)
 
-@st.cache_data
-def create_chart_data(df_long, original_order, chart_type):
+def view_options(matrix):
+    return [f"{antibiotic} Only" for antibiotic in matrix.antibiotics] + [BEST_VIEW]
+
+def create_chart_data(matrix, chart_type):
     """Create and sort chart data based on selected view, preserving CSV order."""
 
-    # Filter plot data based on view and create descriptive titles
-    if chart_type == "Most Effective Across All":
+    # Slice the view straight out of the matrix and pick a descriptive title
+    if chart_type == BEST_VIEW:
         # Get the most effective antibiotic for each bacteria
-        plot_df = df_long.loc[df_long.groupby("Bacteria")["Effectiveness"].idxmax()].copy()
-        title = "Comprehensive Antibiotic Arsenal: Our Best Weapons Against Common Bacterial Threats"
-    elif chart_type == "Penicillin Only":
-        plot_df = df_long[df_long["Antibiotic"] == "Penicillin"].copy()
-        title = "Penicillin: The Gold Standard Against Gram-Positive Bacterial Infections"
-    elif chart_type == "Neomycin Only":
-        plot_df = df_long[df_long["Antibiotic"] == "Neomycin"].copy()
-        title = "Neomycin: Highly Effective Broad-Spectrum Agent, Particularly Against Gram-Negative Bacteria"
-    elif chart_type == "Streptomycin Only":
-        plot_df = df_long[df_long["Antibiotic"] == "Streptomycin"].copy()
-        title = "Streptomycin: A Valuable Alternative with Selective Effectiveness Across Bacterial Species"
-
-    # Get bacteria that are actually in this filtered view
-    used_bacteria = plot_df["Bacteria"].unique().tolist()
-    
-    # Create order preserving original CSV sequence
-    bacteria_order_for_chart = [b for b in original_order if b in used_bacteria]
-    
-    # Create a sorting key by prepending order numbers to bacteria names
-    # This forces alphabetical sorting to follow our desired order
-    bacteria_to_order = {bacteria: i for i, bacteria in enumerate(original_order)}
-    
-    def create_sort_key(bacteria_name):
-        order_num = bacteria_to_order.get(bacteria_name, 999)
-        return f"{order_num:03d}_{bacteria_name}"
-    
-    plot_df["Bacteria_Sort"] = plot_df["Bacteria"].apply(create_sort_key)
-    plot_df = plot_df.sort_values("Bacteria_Sort")
+        plot_df = matrix.view()
+        title = VIEW_TITLES[BEST_VIEW]
+    else:
+        antibiotic = chart_type.removesuffix(" Only")
+        plot_df = matrix.view(antibiotic)
+        title = VIEW_TITLES.get(antibiotic, f"{antibiotic}: Effectiveness Across Bacterial Species")
+
+    # Prefix each name with its CSV position so alphabetical sorting follows the CSV order
+    plot_df["Bacteria_Sort"] = matrix.sort_keys(plot_df.index.to_numpy())
+    bacteria_order_for_chart = plot_df["Bacteria"].tolist()
 
     return plot_df, bacteria_order_for_chart, title
 
 
-def create_chart(plot_df, bacteria_order, title):
-    """Create the Altair chart with custom colors and gram staining-based outlines."""
+def chart_window(matrix, visible, group_by, page):
+    """The rows of one chart page, and the position of its first row among the visible ones."""
+    page_df, start = window(visible, page, PAGE_SIZE)
+    if group_by is not None:
+        # Grouping reorders the bars, so number them by their place in the grouped listing
+        page_df = page_df.copy()
+        page_df["Bacteria_Sort"] = matrix.sort_keys(page_df.index.to_numpy(), start + np.arange(len(page_df)))
+    return page_df, start
+
+
+def create_chart(plot_df, bacteria_order, title, rows=None):
+    """Create the Altair chart with custom colors and gram staining-based outlines.
+
+    rows fixes the viewport height, so every page of a long list is drawn at the same size.
+    """
     
     unique_antibiotics = plot_df["Antibiotic"].unique()
     antibiotic_color_map = {
@@ -121,14 +131,73 @@ def create_chart(plot_df, bacteria_order, title):
         ]
     ).properties(
         width="container",
-        height=max(400, len(bacteria_order) * 30),
+        height=max(400, (rows or len(bacteria_order)) * 30),
         title=alt.TitleParams(text=title, fontSize=16, anchor="start", offset=10)
     ).resolve_scale(color="independent")
 
     return chart
 
+@st.fragment
+def chart_section(matrix, chart_type, resistance_mic):
+    """The chart and its tables; typing a search or paging reruns only this part of the app."""
+    # A rerun of just this fragment never reaches the sidebar panel, so it keeps its own profile
+    profiler = start_profiler()
+
+    # Chart
+    with profiler.span("prepare chart data"):
+        plot_df, bacteria_order, title = create_chart_data(matrix, chart_type)
+
+    # Search, grouping and paging run here, so only one page of bars is serialized per rerun
+    search_col, group_col, page_col = st.columns([3, 2, 1])
+    with search_col:
+        # live commits after a short typing pause, so the bars filter as the name is typed
+        query = st.text_input("🔎 Find Bacteria", placeholder="Part of a name", type="search", live=True)
+    with group_col:
+        group_by = GROUPINGS[st.selectbox("Group By", list(GROUPINGS))]
+    with profiler.span("filter chart rows"):
+        visible = search(plot_df, "Bacteria", query)
+    if group_by is not None:
+        counts = group_counts(visible, group_by)
+        expanded = st.multiselect(
+            "Expanded Groups", list(counts.index), default=list(counts.index),
+            format_func=lambda group: f"{group} ({counts[group]})",
+            help="Remove a group to collapse it"
+        )
+        visible = group_rows(visible, group_by, expanded)
+
+    pages = page_count(len(visible), PAGE_SIZE)
+    if st.session_state.get("chart_page", 1) > pages:
+        st.session_state["chart_page"] = pages
+    with page_col:
+        page = st.number_input("Page", min_value=1, max_value=pages, step=1, key="chart_page")
+
+    if visible.empty:
+        st.info("No bacteria match the search.")
+        profiler.render_panel(st, title="Chart profile")
+        return
+
+    page_df, start = chart_window(matrix, visible, group_by, page)
+    with profiler.span("build chart"):
+        chart = create_chart(page_df, page_df["Bacteria"].tolist(), title, rows=min(len(visible), PAGE_SIZE))
+    profiler.altair_chart("effectiveness chart", chart, use_container_width=True)
+    st.caption(f"Showing {start + 1:,}–{start + len(page_df):,} of {len(visible):,} bacteria")
+    
+    # Data table
+    with st.expander("📊 View Raw Data"):
+        display_df = page_df[["Bacteria", "Gram_Staining", "Antibiotic", "MIC", "Effectiveness"]].round(3)
+        display_df["Resistant To"] = matrix.resistant_counts(resistance_mic)[page_df.index]
+        st.dataframe(display_df, use_container_width=True)
+
+    with st.expander("🧫 Resistance by Gram Stain"):
+        rollup = matrix.rollup(resistance_mic)
+        st.dataframe(rollup.round(3), use_container_width=True)
+
+    profiler.render_panel(st, title="Chart profile")
+
 def main():
     st.set_page_config(page_title="Antibiotic Effectiveness Explorer - We're Prepared!", layout="wide")
+    # Timing spans and the sidebar profile panel are only active with ?profile=1
+    profiler = start_profiler()
     
     st.markdown('<h1 style="font-size:38px;">🧬 Antibiotic Effectiveness Explorer - We are Prepared!</h1>', unsafe_allow_html=True)
     st.markdown("""
@@ -142,7 +211,8 @@ def main():
     
     # Load data
     try:
-        df_long, original_order = load_and_process_data()
+        with profiler.span("load data"):
+            matrix = load_and_process_data()
     except FileNotFoundError:
         st.error("Data file 'bacteriaWithSpacer.csv' not found. Please ensure the file is in the correct location.")
         return
@@ -155,20 +225,16 @@ def main():
         st.header("Chart Options")
         chart_type = st.selectbox(
             "Select Chart View", 
-            [
-                "Penicillin Only",
-                "Streptomycin Only", 
-                "Neomycin Only",
-                "Most Effective Across All"
-            ],
+            view_options(matrix),
             help="Choose which antibiotic data to display"
         )
         
         # Summary stats
         st.subheader("Data Summary")
-        total_bacteria = df_long["Bacteria"].nunique()
-        gram_pos = df_long[df_long["Gram_Staining"] == "positive"]["Bacteria"].nunique()
-        gram_neg = df_long[df_long["Gram_Staining"] == "negative"]["Bacteria"].nunique()
+        strains = matrix.strains
+        total_bacteria = strains["Bacteria"].nunique()
+        gram_pos = strains.loc[strains["Gram_Staining"] == "positive", "Bacteria"].nunique()
+        gram_neg = strains.loc[strains["Gram_Staining"] == "negative", "Bacteria"].nunique()
         
         st.metric("Total Bacteria", total_bacteria)
         col1, col2 = st.columns(2)
@@ -176,16 +242,15 @@ def main():
             st.metric("Gram + (Blue outline)", gram_pos)
         with col2:
             st.metric("Gram - (Red outline)", gram_neg)
+
+        resistance_mic = st.number_input(
+            "Resistant at MIC ≥", min_value=0.0, value=1.0, step=0.5,
+            help="Strains at or above this MIC count as resistant in the tables below"
+        )
     
-    # Chart
-    plot_df, bacteria_order, title = create_chart_data(df_long, original_order, chart_type)
-    chart = create_chart(plot_df, bacteria_order, title)
-    st.altair_chart(chart, use_container_width=True)
-    
-    # Data table
-    with st.expander("📊 View Raw Data"):
-        display_df = plot_df[["Bacteria", "Gram_Staining", "Antibiotic", "MIC", "Effectiveness"]].round(3)
-        st.dataframe(display_df, use_container_width=True)
+    chart_section(matrix, chart_type, resistance_mic)
+
+    profiler.render_panel()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import altair as alt
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from script_loader import load_definitions
+from synthetic import write_dataset
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+DEFAULT_SIZES = "10k,100k"
+
+
+def parse_size(text):
+    """'10k' -> 10000, '1M' -> 1000000."""
+    text = text.strip()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1].lower(), 1)
+    return int(float(text[:-1] if multiplier > 1 else text) * multiplier)
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def chart_stages(build, work_dir, name):
+    """Time chart construction, to_dict validation and HTML save for one chart builder."""
+    result = {"name": name}
+    try:
+        chart, result["build_s"] = timed(build)
+        with alt.data_transformers.disable_max_rows():
+            spec, result["to_dict_s"] = timed(chart.to_dict)
+        result["spec_bytes"] = len(json.dumps(spec))
+        html_path = os.path.join(work_dir, f"{name}.html")
+        _, result["save_s"] = timed(chart.save, html_path)
+        result["html_bytes"] = os.path.getsize(html_path)
+        os.remove(html_path)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def bench_project_chart(rows, work_dir):
+    module = load_definitions(os.path.join("Term Project", "projectChart.py"))
+    module.DATA_FILE = write_dataset("social_media", rows, os.path.join(work_dir, "social_media.csv"))
+    data, load_s = timed(module.load_data)
+    charts = [chart_stages(lambda f=function: f(data), work_dir, name)
+              for name, (function, _) in module.CHARTS.items()]
+    return {"load_s": load_s, "charts": charts}
+
+
+def bench_chart_creation(rows, work_dir):
+    module = load_definitions(os.path.join("Week2", "Discussion2", "chartCreation.py"))
+    path = write_dataset("listings", rows, os.path.join(work_dir, "listings.csv"))
+    data, load_s = timed(pd.read_csv, path, low_memory=False)
+    charts = []
+    for i in range(1, 5):
+        # visualization4 cleans price in place, so every builder gets its own copy
+        frame = data.copy()
+        function = getattr(module, f"visualization{i}")
+        charts.append(chart_stages(lambda f=function, d=frame: f(d), work_dir, f"visualization{i}"))
+    return {"load_s": load_s, "charts": charts}
+
+
+def bench_week2_discussion1(rows, work_dir):
+    module = load_definitions(os.path.join("Week2", "Discussion1", "week2_discussion1.py"))
+    path = write_dataset("oecd", rows, os.path.join(work_dir, "oecd.csv"))
+    data, load_s = timed(pd.read_csv, path)
+    charts = []
+    for i in range(1, 5):
+        frame = data.copy()
+        function = getattr(module, f"visualization{i}")
+        charts.append(chart_stages(lambda f=function, d=frame: f(d), work_dir, f"visualization{i}"))
+    return {"load_s": load_s, "charts": charts}
+
+
+def bench_bacteria(rows, work_dir):
+    module = load_definitions(os.path.join("Week4Redo", "bacteria_visualization.py"))
+    write_dataset("bacteria_wide", rows, os.path.join(work_dir, "bacteriaWithSpacer.csv"))
+    # Time the functions themselves, not Streamlit's cache in front of them
+    load = getattr(module.load_and_process_data, "__wrapped__", module.load_and_process_data)
+    prepare = getattr(module.create_chart_data, "__wrapped__", module.create_chart_data)
+
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        matrix, load_s = timed(load)
+    finally:
+        os.chdir(cwd)
+    (plot_df, order, title), prep_s = timed(prepare, matrix, module.BEST_VIEW)
+    # The app charts one page at a time
+    page_df, _ = module.chart_window(matrix, plot_df, None, 1)
+    chart = chart_stages(lambda: module.create_chart(page_df, page_df["Bacteria"].tolist(), title,
+                                                     rows=len(page_df)), work_dir, "create_chart")
+    return {"load_s": load_s, "prep_s": prep_s, "charts": [chart]}
+
+
+# Streamlit apps: (script, dataset, file name the script reads)
+DASHBOARDS = {
+    "dashboard2": (os.path.join("Term Project Dashboard", "dashboard2.py"),
+                   "social_media", "social_media_vs_productivity.csv"),
+    "airbnb_streamlitVisual": (os.path.join("Week3", "Discussion2", "streamlitVisual.py"),
+                               "listings", "listings.csv"),
+    "airbnb_streamlitVisual2": (os.path.join("Week3", "Discussion2", "streamlitVisual2.py"),
+                                "listings", "listings.csv"),
+    "bacteria_app": (os.path.join("Week4Redo", "bacteria_visualization.py"),
+                     "bacteria_wide", "bacteriaWithSpacer.csv"),
+    "timeline_app": (os.path.join("Week4", "streamlitVisual.py"),
+                     "bacteria_timeline", "bacteria_timeline_tableau.csv"),
+}
+
+
+def chart_payload_bytes(app):
+    """Bytes of every chart message the app sent to the frontend."""
+    total = 0
+    stack = [app.main, app.sidebar]
+    while stack:
+        node = stack.pop()
+        children = getattr(node, "children", None)
+        if isinstance(children, dict):
+            for child in children.values():
+                if child.type in ("vega_lite_chart", "arrow_vega_lite_chart"):
+                    total += child.proto.ByteSize()
+                stack.append(child)
+    return total
+
+
+def bench_dashboard(name, rows, work_dir):
+    """Run a Streamlit app headless twice (cold, then warm caches) against a synthetic file."""
+    from streamlit.testing.v1 import AppTest
+
+    script, dataset, filename = DASHBOARDS[name]
+    app_dir = os.path.join(work_dir, name)
+    os.makedirs(app_dir, exist_ok=True)
+    script_path = os.path.join(app_dir, os.path.basename(script))
+    shutil.copy(os.path.join(REPO_ROOT, script), script_path)
+    write_dataset(dataset, rows, os.path.join(app_dir, filename))
+
+    result = {"name": name}
+    cwd = os.getcwd()
+    os.chdir(app_dir)
+    try:
+        app = AppTest.from_file(script_path, default_timeout=3600)
+        for run in ("cold", "warm"):
+            _, result[f"{run}_run_s"] = timed(app.run)
+        if app.exception:
+            result["error"] = app.exception[0].value
+        result["chart_payload_bytes"] = chart_payload_bytes(app)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        os.chdir(cwd)
+    return result
+
+
+SUITES = {
+    "projectChart": bench_project_chart,
+    "chartCreation": bench_chart_creation,
+    "week2_discussion1": bench_week2_discussion1,
+    "bacteria_visualization": bench_bacteria,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark load, build, validation and export for every script.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Row counts, e.g. 10k,100k,1M,10M")
+    parser.add_argument("--suites", default=",".join(list(SUITES) + list(DASHBOARDS)),
+                        help="Comma-separated suites and dashboards to run")
+    parser.add_argument("-o", "--output", default=None, help="Result file (default: benchmarks/results/<time>-<commit>.json)")
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    suites = [suite.strip() for suite in args.suites.split(",")]
+    unknown = [suite for suite in suites if suite not in SUITES and suite not in DASHBOARDS]
+    if unknown:
+        print(f"Unknown suite(s): {', '.join(unknown)}")
+        sys.exit(1)
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "altair": alt.__version__,
+        "cpu_count": os.cpu_count(),
+        "results": [],
+    }
+
+    for rows in sizes:
+        for suite in suites:
+            with tempfile.TemporaryDirectory(prefix="bench_") as work_dir:
+                print(f"{suite} @ {rows:,} rows ...", flush=True)
+                start = time.perf_counter()
+                try:
+                    if suite in SUITES:
+                        result = SUITES[suite](rows, work_dir)
+                    else:
+                        result = bench_dashboard(suite, rows, work_dir)
+                except Exception as e:
+                    result = {"error": f"{type(e).__name__}: {e}"}
+                result.update({"suite": suite, "rows": rows, "total_s": time.perf_counter() - start})
+                report["results"].append(result)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import ast
+import os
+import sys
+import types
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def has_call(node):
+    return any(isinstance(child, ast.Call) for child in ast.walk(node))
+
+
+def is_constant(node):
+    targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+    return all(isinstance(target, ast.Name) and target.id.isupper() for target in targets)
+
+
+def keep_statement(node):
+    """Imports, definitions, UPPER_CASE constants and call-free assignments; everything
+    that reads files, changes directory, saves charts or draws Streamlit widgets is dropped."""
+    if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef)):
+        return True
+    if isinstance(node, (ast.Assign, ast.AnnAssign)):
+        if node.value is None or is_constant(node):
+            return True
+        return not has_call(node.value)
+    return False
+
+
+def load_definitions(relative_path, name=None):
+    """Import a repo script's functions without running its top-level code.
+
+    Most scripts here load data, save HTML or build a Streamlit page at import time,
+    so they are parsed and only their definitions are executed.
+    """
+    path = os.path.join(REPO_ROOT, relative_path)
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    tree.body = [node for node in tree.body if keep_statement(node)]
+
+    if REPO_ROOT not in sys.path:
+        sys.path.append(REPO_ROOT)
+    module = types.ModuleType(name or os.path.splitext(os.path.basename(path))[0])
+    module.__file__ = path
+    exec(compile(tree, path, "exec"), module.__dict__)
+    return module
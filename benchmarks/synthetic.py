@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+LISTINGS_TEMPLATE = os.path.join(REPO_ROOT, "Week2", "Discussion2", "listings.csv.gz")
+OECD_TEMPLATE = os.path.join(REPO_ROOT, "Week2", "Discussion1", "oecd-wealth-health-2014.csv")
+
+PLATFORMS = ["Facebook", "Instagram", "TikTok", "Twitter", "Telegram"]
+JOB_TYPES = ["IT", "Education", "Health", "Finance", "Unemployed", "Student"]
+GENDERS = ["Male", "Female", "Other"]
+
+
+def with_missing(values, rng, share=0.05):
+    """Blank out a share of a float column, like the real survey export."""
+    values = values.astype("float64")
+    values[rng.random(len(values)) < share] = np.nan
+    return values
+
+
+# Synthetic datasets at any row count, matching the schemas of the repo's real CSVs
+
+def social_media(rows, seed=0):
+    """Rows shaped like social_media_vs_productivity.csv."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "age": rng.integers(18, 66, rows),
+        "gender": rng.choice(GENDERS, rows),
+        "job_type": rng.choice(JOB_TYPES, rows),
+        "daily_social_media_time": with_missing(rng.gamma(2.0, 1.6, rows), rng),
+        "social_platform_preference": rng.choice(PLATFORMS, rows),
+        "number_of_notifications": rng.integers(30, 91, rows),
+        "work_hours_per_day": rng.normal(7.0, 2.0, rows).clip(1, 12),
+        "perceived_productivity_score": with_missing(rng.normal(5.5, 1.8, rows).clip(2, 9), rng),
+        "actual_productivity_score": with_missing(rng.normal(4.9, 1.5, rows).clip(0, 10), rng),
+        "stress_level": with_missing(rng.integers(1, 11, rows), rng),
+        "sleep_hours": with_missing(rng.normal(6.5, 1.2, rows).clip(3, 10), rng),
+        "screen_time_before_sleep": with_missing(rng.gamma(2.0, 0.5, rows), rng),
+        "breaks_during_work": rng.integers(0, 11, rows),
+        "uses_focus_apps": rng.random(rows) < 0.3,
+        "has_digital_wellbeing_enabled": rng.random(rows) < 0.3,
+        "coffee_consumption_per_day": rng.integers(0, 6, rows),
+        "days_feeling_burnout_per_month": rng.integers(0, 32, rows),
+        "weekly_offline_hours": rng.gamma(3.0, 3.5, rows),
+        "job_satisfaction_score": with_missing(rng.normal(5.0, 2.0, rows).clip(0, 10), rng),
+    })
+
+
+def resample(template, rows, rng, jitter=()):
+    """Bootstrap rows from a real file and jitter numeric columns so values aren't just repeats."""
+    data = template.iloc[rng.integers(0, len(template), rows)].reset_index(drop=True)
+    for column in jitter:
+        values = data[column].to_numpy(dtype="float64", na_value=np.nan)
+        data[column] = values * rng.uniform(0.9, 1.1, rows)
+    return data
+
+
+def listings(rows, seed=0):
+    """Rows with every column of the Inside Airbnb listings.csv, bootstrapped from the real file."""
+    rng = np.random.default_rng(seed)
+    template = pd.read_csv(LISTINGS_TEMPLATE, low_memory=False)
+    data = resample(template, rows, rng)
+    data["id"] = np.arange(1, rows + 1)
+    # Keep price in the raw "$1,234.00" form the scripts clean themselves
+    price = template["price"].replace(r"[\$,]", "", regex=True).astype(float)
+    new_price = price.iloc[rng.integers(0, len(price), rows)].to_numpy() * rng.uniform(0.9, 1.1, rows)
+    data["price"] = pd.Series(new_price).map(lambda p: "" if np.isnan(p) else f"${p:,.2f}")
+    data["estimated_occupancy_l365d"] = rng.integers(0, 256, rows)
+    return data
+
+
+def oecd(rows, seed=0):
+    """Rows shaped like oecd-wealth-health-2014.csv (a country panel when rows > 188)."""
+    rng = np.random.default_rng(seed)
+    template = pd.read_csv(OECD_TEMPLATE)
+    data = resample(template, rows, rng, jitter=["LifeExpectancy", "Income", "Population"])
+    data["Income"] = data["Income"].round().astype("Int64")
+    data["Population"] = data["Population"].round().astype("Int64")
+    data["LifeExpectancy"] = data["LifeExpectancy"].round(1)
+    return data
+
+
+def bacteria_wide(rows, seed=0, antibiotics=("Penicillin", "Streptomycin", "Neomycin")):
+    """Rows shaped like bacteriaWithSpacer.csv (one strain per row, MIC per antibiotic)."""
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({"Bacteria": [f"Strain {i:07d}" for i in range(rows)]})
+    for antibiotic in antibiotics:
+        data[antibiotic] = np.round(10 ** rng.uniform(-3, 3, rows), 3)
+    data["Gram_Staining"] = rng.choice(["positive", "negative"], rows)
+    data["Genus"] = rng.choice(["Staphylococcus", "Streptococcus", "Salmonella", "other"], rows)
+    return data
+
+
+def bacteria_timeline(rows, seed=0):
+    """Rows shaped like bacteria_timeline_tableau.csv (long format, one test per row)."""
+    rng = np.random.default_rng(seed)
+    strains = max(1, rows // 3)
+    bacteria = rng.integers(0, strains, rows)
+    return pd.DataFrame({
+        "Bacteria": [f"Strain {b:07d}" for b in bacteria],
+        "Gram_Staining": np.where(bacteria % 2 == 0, "positive", "negative"),
+        "Genus": np.where(bacteria % 3 == 0, "Streptococcus", "other"),
+        "Antibiotic": rng.choice(["Penicillin", "Streptomycin", "Neomycin"], rows),
+        "MIC": np.round(10 ** rng.uniform(-3, 3, rows), 3),
+        "Order": np.sort(rng.integers(1, strains + 1, rows)),
+    })
+
+
+GENERATORS = {
+    "social_media": social_media,
+    "listings": listings,
+    "oecd": oecd,
+    "bacteria_wide": bacteria_wide,
+    "bacteria_timeline": bacteria_timeline,
+}
+
+
+def write_dataset(name, rows, path, seed=0):
+    """Generate a dataset and write it as CSV (gzipped when the path ends in .gz)."""
+    data = GENERATORS[name](rows, seed)
+    data.to_csv(path, index=False)
+    return path
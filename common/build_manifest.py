@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+
+import altair as alt
+import pandas as pd
+
+from common.pushdown import optimize
+from common.shared_data import external_data, prune_data_files, save_html
+
+MANIFEST_NAME = ".build_manifest.json"
+
+
+def dataset_hash(data):
+    """Content hash of a DataFrame: column names, dtypes and every value."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(c), str(t)] for c, t in data.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+def chart_hash(chart, source_hash, options):
+    """Hash of everything that ends up in an exported chart file."""
+    digest = hashlib.sha256()
+    digest.update(source_hash.encode())
+    digest.update(alt.__version__.encode())
+    digest.update(json.dumps(options, sort_keys=True, default=str).encode())
+    # chart.save() lifts the row limit while serializing, so the hash has to as well
+    with alt.data_transformers.disable_max_rows():
+        digest.update(chart.to_json(sort_keys=True, indent=None).encode())
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """Tracks the hash of every exported chart so unchanged charts are not rewritten.
+
+    With pushdown=True, filters, calculations, aggregates and bins are run in pandas
+    before a changed chart is written, and the result is checked against a render of
+    the original chart; a chart that doesn't match, or can't be rendered to check
+    (vl-convert or Pillow missing), is written unoptimized.
+
+    Usage:
+        manifest = BuildManifest(output_dir, data, shared_data=False, pushdown=False)
+        manifest.save(chart, "chart.html")
+        manifest.finish()   # removes outputs that were not produced this run
+    """
+
+    def __init__(self, output_dir=".", data=None, shared_data=False, pushdown=False):
+        self.output_dir = output_dir
+        self.shared_data = shared_data
+        self.pushdown = pushdown
+        os.makedirs(output_dir, exist_ok=True)
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.source_hash = dataset_hash(data) if data is not None else ""
+        self.previous = self._read()
+        self.current = {}
+        self.written = []
+        self.skipped = []
+        self.unverified = []
+        self.unchecked = []
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f).get("outputs", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self, chart, filename, **options):
+        """Save the chart unless an identical file from a previous run is already on disk."""
+        target = os.path.join(self.output_dir, filename)
+        # The unoptimized spec is hashed, so unchanged charts skip the pushdown and its check too
+        hashed_options = {**options, "pushdown": True} if self.pushdown else options
+        if self.shared_data:
+            # Hash the spec as it will be written, i.e. with data URLs instead of inline rows
+            with external_data(self.output_dir):
+                digest = chart_hash(chart, self.source_hash, hashed_options)
+        else:
+            digest = chart_hash(chart, self.source_hash, hashed_options)
+        self.current[filename] = digest
+
+        if self.previous.get(filename) == digest and os.path.exists(target):
+            self.skipped.append(filename)
+            return False
+        if self.pushdown:
+            optimized, verified = optimize(chart)
+            if verified:
+                chart = optimized
+            elif verified is None:
+                self.unchecked.append(filename)
+            else:
+                self.unverified.append(filename)
+        if self.shared_data:
+            save_html(chart, filename, self.output_dir)
+        else:
+            chart.save(target, **options)
+        self.written.append(filename)
+        return True
+
+    def clean_stale(self):
+        """Delete outputs recorded by a previous run that this run did not produce."""
+        removed = []
+        for filename in self.previous:
+            if filename not in self.current:
+                target = os.path.join(self.output_dir, filename)
+                if os.path.exists(target):
+                    os.remove(target)
+                removed.append(filename)
+        return removed
+
+    def finish(self):
+        """Clean up stale outputs and write the manifest for the next run."""
+        removed = self.clean_stale()
+        if self.shared_data:
+            prune_data_files(self.output_dir)
+        with open(self.path, "w") as f:
+            json.dump({"outputs": self.current}, f, indent=2, sort_keys=True)
+        print(f"Wrote {len(self.written)} chart(s), skipped {len(self.skipped)} unchanged, "
+              f"removed {len(removed)} stale")
+        if self.unverified:
+            print(f"Saved unoptimized, pushdown did not match the original: {', '.join(self.unverified)}")
+        if self.unchecked:
+            print(f"Saved unoptimized, pushdown could not be verified (install vl-convert and Pillow): "
+                  f"{', '.join(self.unchecked)}")
+        return removed
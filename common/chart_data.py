@@ -0,0 +1,95 @@
+import re
+
+import altair as alt
+import pandas as pd
+
+# Spec keys whose string (or list-of-string) values name data fields: encodings,
+# sort/timeUnit/bin definitions, selection params and the transforms that read columns
+FIELD_KEYS = {
+    "field", "fields", "groupby", "fold", "flatten", "pivot", "value", "key", "impute",
+    "density", "regression", "loess", "on", "quantile", "stack", "sort",
+}
+
+# datum.name / datum['name'] / datum["name"] inside filter and calculate expressions
+DATUM_PATTERN = re.compile(r"""datum\s*(?:\.\s*([A-Za-z_$][\w$]*)|\[\s*(['"])(.*?)\2\s*\])""")
+
+SUBCHART_ATTRIBUTES = ("layer", "hconcat", "vconcat", "concat", "spec")
+
+
+def subcharts(chart):
+    """The chart and every chart nested in it through layers, concatenation, facets and repeats."""
+    yield chart
+    for attribute in SUBCHART_ATTRIBUTES:
+        children = getattr(chart, attribute, alt.Undefined)
+        if children is alt.Undefined:
+            continue
+        for child in children if isinstance(children, list) else [children]:
+            if isinstance(child, alt.TopLevelMixin) or hasattr(child, "data"):
+                yield from subcharts(child)
+
+
+def _unescape(field):
+    # Vega-Lite escapes dots and brackets in column names that aren't nested paths
+    return field.replace("\\.", ".").replace("\\[", "[").replace("\\]", "]")
+
+
+def _collect(node, fields):
+    """Walk a spec dict, returning False when it shows every column (tooltip: true)."""
+    if isinstance(node, dict):
+        if node.get("tooltip") is True or node.get("tooltip") == {"content": "data"}:
+            return False
+        for key, value in node.items():
+            if key in FIELD_KEYS:
+                names = value if isinstance(value, list) else [value]
+                fields.update(_unescape(name) for name in names if isinstance(name, str))
+            if isinstance(value, str):
+                for match in DATUM_PATTERN.finditer(value):
+                    fields.add(match.group(1) or match.group(3))
+            elif not _collect(value, fields):
+                return False
+    elif isinstance(node, list):
+        return all(_collect(item, fields) for item in node)
+    elif isinstance(node, str):
+        for match in DATUM_PATTERN.finditer(node):
+            fields.add(match.group(1) or match.group(3))
+    return True
+
+
+def referenced_fields(chart):
+    """Every field name the chart's encodings, tooltips, params and transforms refer to.
+
+    Returns None when the chart needs every column (a tooltip showing all fields).
+    Names produced by transforms ("as") are included too; they simply match no column.
+    """
+    # Build the spec against empty frames so this costs the same at any row count
+    probe = chart.copy(deep=True, ignore=["data"])
+    for node in subcharts(probe):
+        if isinstance(getattr(node, "data", None), pd.DataFrame):
+            node.data = node.data.head(0)
+    spec = probe.to_dict()
+    spec.pop("datasets", None)
+    fields = set()
+    return fields if _collect(spec, fields) else None
+
+
+def prune_chart_data(chart):
+    """Project every DataFrame in the chart down to the columns it actually encodes.
+
+    Altair serializes all columns of the data it's given, so a two-field chart built on
+    a wide frame ships every other column to the browser too. Frames shared between
+    subcharts are pruned once, so they still end up as a single dataset in the spec.
+    """
+    fields = referenced_fields(chart)
+    if fields is None:
+        return chart
+    pruned = chart.copy(deep=True, ignore=["data"])
+    projections = {}
+    for node in subcharts(pruned):
+        data = getattr(node, "data", None)
+        if not isinstance(data, pd.DataFrame):
+            continue
+        if id(data) not in projections:
+            columns = [column for column in data.columns if column in fields]
+            projections[id(data)] = data if len(columns) == len(data.columns) else data[columns]
+        node.data = projections[id(data)]
+    return pruned
@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+
+# Rows parsed per chunk; peak memory is a few chunks plus the partial aggregates
+CHUNK_ROWS = 250_000
+
+
+def cell_codes(values, width):
+    """Fixed-width cell of every value (floor(value / width)); the small offset absorbs float error on edges."""
+    values = pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    return np.floor(values / width + 1e-9).astype(np.int64)
+
+
+class GroupMoments:
+    """Sum, count and sum of squares of metrics per group, updated chunk by chunk.
+
+    by groups on column values; cells groups numeric columns by fixed-width cell instead, so
+    bins whose edges are only known after the last chunk (they depend on the column's
+    range) can still be formed at the end by merging cells. Rows missing a grouping value,
+    or any column in `where`, are skipped; each metric only counts its present values.
+    Partial results of two instances over different chunks merge with merge().
+    """
+
+    def __init__(self, by=(), metrics=(), cells=None, where=()):
+        self.by = list(by)
+        self.cells = dict(cells or {})
+        self.metrics = list(metrics)
+        self.where = list(where)
+        # Each metric is shifted by the first value seen, so the one-pass variance stays
+        # accurate for values far from zero; the shift is fixed once chosen
+        self.shift = {}
+        self.partial = None
+
+    @property
+    def keys(self):
+        return self.by + list(self.cells)
+
+    def update(self, chunk):
+        rows = chunk.dropna(subset=self.keys + self.where)
+        columns = {column: rows[column].to_numpy() for column in self.by}
+        for column, width in self.cells.items():
+            columns[column] = cell_codes(rows[column], width)
+        columns[("size", "")] = np.ones(len(rows), dtype=np.int64)
+        for metric in self.metrics:
+            values = pd.to_numeric(rows[metric], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+            valid = ~np.isnan(values)
+            if metric not in self.shift and valid.any():
+                self.shift[metric] = values[valid][0]
+            shifted = np.where(valid, values - self.shift.get(metric, 0.0), 0.0)
+            columns[("sum", metric)] = shifted
+            columns[("sum_sq", metric)] = shifted ** 2
+            columns[("count", metric)] = valid.astype(np.int64)
+        partial = pd.DataFrame(columns).groupby(self.keys, observed=True, sort=False).sum()
+        partial.columns = pd.MultiIndex.from_tuples(partial.columns)
+        self._add(partial)
+
+    def _add(self, partial):
+        self.partial = partial if self.partial is None else self.partial.add(partial, fill_value=0)
+
+    def merge(self, other):
+        """Fold in another instance's partials, re-shifting them onto this instance's shifts."""
+        partial = other.partial.copy()
+        for metric in self.metrics:
+            if metric not in other.shift:
+                continue
+            self.shift.setdefault(metric, other.shift[metric])
+            delta = other.shift[metric] - self.shift[metric]
+            n, total = partial[("count", metric)], partial[("sum", metric)]
+            partial[("sum_sq", metric)] += 2 * delta * total + n * delta ** 2
+            partial[("sum", metric)] = total + n * delta
+        self._add(partial)
+        return self
+
+    def cell_mids(self, column, codes):
+        """Centre of each cell of a cells column."""
+        return (np.asarray(codes, dtype="float64") + 0.5) * self.cells[column]
+
+    def _grouped(self, regroup):
+        partial = self.partial.reset_index()
+        for column, function in (regroup or {}).items():
+            partial[column] = function(np.asarray(partial[column]))
+        values = partial.drop(columns=self.keys, level=0)
+        values.index = pd.MultiIndex.from_frame(partial[self.keys].droplevel(1, axis=1))
+        return values.groupby(level=list(range(len(self.keys))), observed=True, sort=True).sum()
+
+    def summary(self, regroup=None):
+        """One row per (group, metric): <keys>, metric, mean, count, std, missing.
+
+        common.group_summary.grouped_summary builds it from a whole frame with one update().
+        regroup maps a key column to a function of its values (e.g. cell -> bin); groups
+        that map to the same key are merged first.
+        """
+        totals = self._grouped(regroup)
+        rows = []
+        for metric in self.metrics:
+            n = totals[("count", metric)]
+            total = totals[("sum", metric)]
+            mean = total / n.where(n > 0) + self.shift.get(metric, 0.0)
+            variance = (totals[("sum_sq", metric)] - total ** 2 / n.where(n > 0)) / (n - 1).where(n > 1)
+            rows.append(pd.DataFrame({
+                "metric": metric,
+                "mean": mean,
+                "count": n.astype("int64"),
+                "std": np.sqrt(variance.clip(lower=0)),
+                "missing": (totals[("size", "")] - n).astype("int64"),
+            }))
+        summary = pd.concat(rows).reset_index()
+        summary.columns = self.keys + list(summary.columns[len(self.keys):])
+        return summary
+
+    def means(self, regroup=None):
+        """One row per group with the mean of every metric under the metric's own name."""
+        summary = self.summary(regroup)
+        return summary.pivot(index=self.keys, columns="metric", values="mean")[self.metrics].reset_index().rename_axis(columns=None)
+
+    def sizes(self, regroup=None):
+        """Rows per group."""
+        totals = self._grouped(regroup)
+        return totals[("size", "")].astype("int64").rename("count").reset_index()
+
+
+class PresentCounts:
+    """Rows with every column of each column set present."""
+
+    def __init__(self, column_sets):
+        self.column_sets = [tuple(columns) for columns in column_sets]
+        self.counts = dict.fromkeys(self.column_sets, 0)
+
+    def update(self, chunk):
+        for columns in self.column_sets:
+            self.counts[columns] += int(chunk[list(columns)].notna().all(axis=1).sum())
+
+    def merge(self, other):
+        for columns, count in other.counts.items():
+            self.counts[columns] = self.counts.get(columns, 0) + count
+        return self
+
+
+class Reservoir:
+    """Uniform sample of up to `size` rows per stratum, kept as the rows with the smallest random keys.
+
+    Bottom-k samples merge by keeping the smallest keys of the union, so chunks (or whole
+    files) can be sampled separately. Rows come back in file order.
+    """
+
+    def __init__(self, columns, size, strata=None, seed=0):
+        self.columns = list(columns)
+        self.size = size
+        self.strata = strata
+        self.rng = np.random.default_rng(seed)
+        self.offset = 0
+        self.sample = None
+
+    def _keep(self, rows):
+        rows = rows.sort_values("_key", kind="stable")
+        if self.strata is None:
+            return rows.head(self.size)
+        return rows.groupby(self.strata, observed=True, dropna=False, sort=False).head(self.size)
+
+    def update(self, chunk):
+        rows = chunk[self.columns + ([self.strata] if self.strata and self.strata not in self.columns else [])].copy()
+        rows["_key"] = self.rng.random(len(rows))
+        rows["_row"] = np.arange(self.offset, self.offset + len(rows))
+        self.offset += len(rows)
+        self.sample = self._keep(rows if self.sample is None else pd.concat([self.sample, rows], ignore_index=True))
+
+    def merge(self, other):
+        other_rows = other.sample.assign(_row=other.sample["_row"] + self.offset)
+        self.offset += other.offset
+        self.sample = self._keep(pd.concat([self.sample, other_rows], ignore_index=True))
+        return self
+
+    def rows(self):
+        return self.sample.sort_values("_row").drop(columns=["_key", "_row"]).reset_index(drop=True)
+
+
+def scan_csv(path, aggregators, chunk_rows=CHUNK_ROWS, prepare=None, **read_csv_kwargs):
+    """Feed every chunk of a CSV to each aggregator's update(); returns the number of rows read.
+
+    prepare, if given, is applied to each chunk first (e.g. common.compact_loader.compact_frame).
+    """
+    rows = 0
+    for chunk in pd.read_csv(path, chunksize=chunk_rows, **read_csv_kwargs):
+        if prepare is not None:
+            chunk = prepare(chunk)
+        for aggregator in aggregators:
+            aggregator.update(chunk)
+        rows += len(chunk)
+    return rows
+
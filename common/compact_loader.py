@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+
+# Schemas map column -> compact dtype. Columns not listed are inferred by compact_frame().
+# The social media scores and hours carry full double precision, which float32 would round
+# (1.546217250953165 -> 1.5462172031402588 in tooltips), so they stay float64.
+SOCIAL_MEDIA_SCHEMA = {
+    "age": "Int8",
+    "gender": "category",
+    "job_type": "category",
+    "social_platform_preference": "category",
+    "daily_social_media_time": "float64",
+    "number_of_notifications": "Int16",
+    "work_hours_per_day": "float64",
+    "perceived_productivity_score": "float64",
+    "actual_productivity_score": "float64",
+    "stress_level": "Int8",
+    "sleep_hours": "float64",
+    "screen_time_before_sleep": "float64",
+    "breaks_during_work": "Int8",
+    "uses_focus_apps": "boolean",
+    "has_digital_wellbeing_enabled": "boolean",
+    "coffee_consumption_per_day": "Int8",
+    "days_feeling_burnout_per_month": "Int8",
+    "weekly_offline_hours": "float64",
+    "job_satisfaction_score": "float64",
+}
+
+LISTINGS_SCHEMA = {
+    "source": "category",
+    "host_response_time": "category",
+    "host_is_superhost": "category",
+    "host_has_profile_pic": "category",
+    "host_identity_verified": "category",
+    "neighbourhood": "category",
+    "neighbourhood_cleansed": "category",
+    "property_type": "category",
+    "room_type": "category",
+    "bathrooms_text": "category",
+    "has_availability": "category",
+    "instant_bookable": "category",
+    "accommodates": "Int8",
+    "bedrooms": "Int8",
+    "beds": "Int16",
+    "latitude": "float64",
+    "longitude": "float64",
+    "estimated_occupancy_l365d": "Int16",
+}
+
+# Text columns with at most this share of distinct values become categoricals
+CATEGORY_RATIO = 0.5
+
+
+def smallest_int_dtype(values):
+    """Smallest nullable integer dtype that holds every value in the column."""
+    low, high = values.min(), values.max()
+    for dtype, info in (("Int8", np.iinfo(np.int8)), ("Int16", np.iinfo(np.int16)),
+                        ("Int32", np.iinfo(np.int32))):
+        if info.min <= low and high <= info.max:
+            return dtype
+    return "Int64"
+
+
+def float32_is_lossless(values, rtol=1e-6):
+    """True when casting to float32 keeps every value within rtol."""
+    original = values.to_numpy(dtype="float64", na_value=np.nan)
+    return np.allclose(original.astype("float32"), original, rtol=rtol, atol=0, equal_nan=True)
+
+
+def infer_dtype(column):
+    """Pick a compact dtype for a column that is not in the schema."""
+    non_null = column.dropna()
+    if non_null.empty:
+        return None
+    if pd.api.types.is_bool_dtype(column):
+        return "boolean" if column.isna().any() else "bool"
+    if pd.api.types.is_integer_dtype(column):
+        return smallest_int_dtype(non_null)
+    if pd.api.types.is_float_dtype(column):
+        if (non_null == non_null.round()).all():
+            return smallest_int_dtype(non_null)
+        return "float32" if float32_is_lossless(non_null) else None
+    if pd.api.types.is_object_dtype(column) or pd.api.types.is_string_dtype(column):
+        if non_null.nunique() <= CATEGORY_RATIO * len(non_null):
+            return "category"
+    return None
+
+
+def cast_column(column, dtype):
+    """Cast one column, going through a numeric parse for integer and float targets."""
+    if dtype == "boolean" and not column.isna().any():
+        # A plain numpy bool is 1 byte per row; the nullable one adds a mask byte
+        dtype = "bool"
+    if str(column.dtype) == dtype:
+        return column
+    if dtype.startswith("Int"):
+        numeric = pd.to_numeric(column, errors="coerce")
+        if not (numeric.dropna() == numeric.dropna().round()).all():
+            raise ValueError(f"Column {column.name!r} has fractional values and cannot be {dtype}")
+        return numeric.astype(dtype)
+    if dtype.startswith("float"):
+        return pd.to_numeric(column, errors="coerce").astype(dtype)
+    return column.astype(dtype)
+
+
+def compact_frame(data, schema=None, infer=True):
+    """Return a copy of data with schema dtypes applied and the remaining columns inferred."""
+    schema = schema or {}
+    compact = {}
+    for name, column in data.items():
+        dtype = schema.get(name) or (infer_dtype(column) if infer else None)
+        compact[name] = cast_column(column, dtype) if dtype else column
+    return pd.DataFrame(compact, index=data.index)
+
+
+def load_compact(path, schema=None, columns=None, infer=True, **read_csv_kwargs):
+    """Read a CSV straight into compact dtypes.
+
+    Categoricals are parsed as such so the full object column is never built;
+    numeric columns are narrowed after parsing so malformed values surface as errors.
+    """
+    schema = schema or {}
+    parse_dtypes = {name: dtype for name, dtype in schema.items()
+                    if dtype == "category" and (columns is None or name in columns)}
+    data = pd.read_csv(path, usecols=columns, dtype=parse_dtypes, **read_csv_kwargs)
+    return compact_frame(data, schema, infer)
+
+
+def default_dtype(column):
+    """The dtype pandas would have given the column without a schema."""
+    dtype = column.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return object
+    if pd.api.types.is_extension_array_dtype(dtype):
+        if pd.api.types.is_bool_dtype(dtype):
+            return object if column.isna().any() else bool
+        if pd.api.types.is_integer_dtype(dtype):
+            return "float64" if column.isna().any() else "int64"
+        return dtype
+    if pd.api.types.is_float_dtype(dtype):
+        return "float64"
+    return dtype
+
+
+def memory_report(data):
+    """Bytes per column with default dtypes vs. the current compact dtypes, plus a total row."""
+    rows = []
+    for name, column in data.items():
+        after = column.memory_usage(index=False, deep=True)
+        before = column.astype(default_dtype(column)).memory_usage(index=False, deep=True)
+        rows.append({"column": name, "dtype": str(column.dtype),
+                     "bytes_before": int(before), "bytes_after": int(after)})
+    report = pd.DataFrame(rows).set_index("column")
+    report.loc["TOTAL"] = ["", report["bytes_before"].sum(), report["bytes_after"].sum()]
+    report["saved_pct"] = (1 - report["bytes_after"] / report["bytes_before"]).mul(100).round(1)
+    return report
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+from common.pushdown import bin_params
+
+
+def bin_codes(values, maxbins, extent=None):
+    """Bin index of every value, with Vega's bin boundaries for the same maxbins.
+
+    Returns (codes, start, step, bins); missing values get code -1.
+    """
+    values = pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    extent = extent or (np.nanmin(values), np.nanmax(values))
+    start, stop, step = bin_params(extent, maxbins=maxbins)
+    bins = max(1, int(round((stop - start) / step)))
+    with np.errstate(invalid="ignore"):
+        codes = np.floor(1e-14 + (values - start) / step)
+    codes = np.where(np.isnan(codes), -1, np.clip(codes, 0, bins - 1)).astype(np.int64)
+    return codes, start, step, bins
+
+
+def build_cube(data, categories=(), bins=None):
+    """Row counts for every occupied cell of categories x numeric bins, in one pass.
+
+    bins maps a numeric column to its maxbins. Each binned column becomes
+    <column>_start, <column>_end and <column>_mid in the result, followed by "count".
+    Rows missing any of the columns are left out, as Vega-Lite drops them from bins.
+    The cube's size depends on the number of occupied cells, not on len(data).
+    """
+    bins = bins or {}
+    dimensions = []
+    for column in categories:
+        codes, labels = pd.factorize(data[column], sort=True)
+        dimensions.append((column, codes.astype(np.int64), len(labels), labels))
+    for column, maxbins in bins.items():
+        codes, start, step, count = bin_codes(data[column], maxbins)
+        dimensions.append((column, codes, count, (start, step)))
+
+    valid = np.ones(len(data), dtype=bool)
+    key = np.zeros(len(data), dtype=np.int64)
+    for _, codes, size, _ in dimensions:
+        valid &= codes >= 0
+        key = key * size + np.maximum(codes, 0)
+    cells, counts = np.unique(key[valid], return_counts=True)
+
+    cube = {}
+    for column, _, size, labels in reversed(dimensions):
+        codes = cells % size
+        cells = cells // size
+        if column in bins:
+            start, step = labels
+            cube[f"{column}_start"] = start + codes * step
+            cube[f"{column}_end"] = start + (codes + 1) * step
+            cube[f"{column}_mid"] = start + (codes + 0.5) * step
+        else:
+            cube[column] = np.asarray(labels)[codes]
+    columns = [column for column, *_ in dimensions]
+    ordered = {}
+    for column in columns:
+        for name in (column, f"{column}_start", f"{column}_end", f"{column}_mid"):
+            if name in cube:
+                ordered[name] = cube[name]
+    ordered["count"] = counts
+    return pd.DataFrame(ordered)
+
+
+def step_cuts(values, step):
+    """Cell of every value between cuts placed every `step`, rounded like slider values.
+
+    Returns (start, end, on_cut): the cuts around each value and whether it sits exactly
+    on its lower cut. Comparisons use the rounded cuts, so a slider value such as 5.3
+    matches the same rows here as in a raw low <= value <= high filter.
+    """
+    decimals = len(f"{step:g}".partition(".")[2])
+    values = pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    cell = np.floor(values / step)
+    cell = np.where(values < np.round(cell * step, decimals), cell - 1, cell)
+    cell = np.where(values >= np.round((cell + 1) * step, decimals), cell + 1, cell)
+    start, end = np.round(cell * step, decimals), np.round((cell + 1) * step, decimals)
+    return start, end, values == start
+
+
+class AggregateCube:
+    """Sums and counts of measures for every occupied cell of some dimensions, built in one pass.
+
+    Any filter on the dimensions, and any mean or count grouped by one of them, is then
+    answered by summing cells, whose number depends on the dimensions' cardinalities
+    rather than on len(data):
+
+        cube = AggregateCube(data, ["gender", "job_type"], {"sleep_hours": 0.1}, ["work_hours_per_day"])
+        cells = cube.select({"job_type": ["IT"]}, {"sleep_hours": (6.0, 8.0)})
+        cube.means("gender", "work_hours_per_day", cells)
+
+    ranges maps a numeric column to a step. Values exactly on a cut get cells of their own,
+    so an inclusive range whose ends are multiples of the step selects exactly the rows a
+    raw filter would. Missing category values are kept as a value of their own; rows
+    missing a required column or a range column are left out.
+    """
+
+    def __init__(self, data, categories=(), ranges=None, measures=(), required=()):
+        self.categories = list(categories)
+        self.ranges = dict(ranges or {})
+        self.measures = list(measures)
+        rows = data.dropna(subset=list(required) + list(self.ranges))
+
+        columns = {column: rows[column] for column in self.categories}
+        for column, step in self.ranges.items():
+            start, end, on_cut = step_cuts(rows[column], step)
+            columns[f"{column}_start"], columns[f"{column}_end"], columns[f"{column}_on_cut"] = start, end, on_cut
+        keys = list(columns)
+        for measure in self.measures:
+            values = rows[measure].astype("float64")
+            columns[f"{measure}_sum"] = values.fillna(0.0)
+            columns[f"{measure}_count"] = values.notna().astype(np.int64)
+        columns["count"] = np.ones(len(rows), dtype=np.int64)
+        frame = pd.DataFrame(columns, index=rows.index)
+        self.cells = frame.groupby(keys, observed=True, dropna=False, sort=False).sum().reset_index()
+
+    def select(self, categories=None, ranges=None):
+        """Boolean mask of the cells matching every category selection and inclusive range."""
+        mask = np.ones(len(self.cells), dtype=bool)
+        for column, values in (categories or {}).items():
+            mask &= self.cells[column].isin(values).to_numpy(dtype=bool, na_value=False)
+        for column, (low, high) in (ranges or {}).items():
+            start = self.cells[f"{column}_start"].to_numpy()
+            end = self.cells[f"{column}_end"].to_numpy()
+            on_cut = self.cells[f"{column}_on_cut"].to_numpy()
+            mask &= np.where(on_cut, (low <= start) & (start <= high), (low <= start) & (end <= high))
+        return mask
+
+    def count(self, mask=None):
+        """Rows in the selected cells."""
+        cells = self.cells if mask is None else self.cells[mask]
+        return int(cells["count"].sum())
+
+    def means(self, by, measure, mask=None):
+        """Mean of a measure per value of `by` over the selected cells, like groupby(by)[measure].mean()."""
+        cells = self.cells if mask is None else self.cells[mask]
+        totals = cells.groupby(by, observed=True, sort=True)[[f"{measure}_sum", f"{measure}_count"]].sum()
+        means = totals[f"{measure}_sum"] / totals[f"{measure}_count"].where(totals[f"{measure}_count"] > 0)
+        return means.rename(measure).reset_index()
@@ -0,0 +1,125 @@
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from common.sketches import column_range
+
+
+class Feature:
+    """A named derived column: the base columns it reads and a vectorized function of the frame."""
+
+    def __init__(self, columns, compute, description=""):
+        self.columns = list(columns)
+        self.compute = compute
+        self.description = description
+
+
+def binned(column, bins):
+    """Equal-width bins of a column over its full range, labelled like pd.cut(...).astype(str).
+
+    The range comes from the frame's sketch (common.sketches) when it has one, so the
+    column isn't scanned for its min and max first.
+    """
+    def compute(data):
+        # pd.cut derives its edges from the min and max alone, so two values of the same dtype suffice
+        extent = pd.Series(column_range(data, column), dtype=data[column].dtype)
+        edges = pd.cut(extent, bins=bins, retbins=True)[1]
+        codes = pd.cut(data[column], bins=edges)
+        return codes.cat.rename_categories([str(interval) for interval in codes.cat.categories])
+    return Feature([column], compute, f"{column} in {bins} equal-width bins")
+
+
+def neg_log10_values(values):
+    """-log10 of a float array of any shape, NaN where a value is <= 0 or missing."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(values > 0, -np.log10(values), np.nan)
+
+
+def neg_log10(column, decimals=None):
+    """-log10 of a column (so a smaller MIC scores higher); values <= 0 become missing."""
+    def compute(data):
+        values = pd.to_numeric(data[column], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        result = neg_log10_values(values)
+        if decimals is not None:
+            result = np.round(result, decimals)
+        return pd.Series(result, index=data.index, name=column)
+    return Feature([column], compute, f"-log10({column})")
+
+
+class DerivedStore:
+    """Derived columns of one base frame, each computed once on first request.
+
+    Keep one store per dataset version next to the base frame (e.g. in the same
+    st.cache_resource entry); chart builders then ask for features by name:
+
+        store = DerivedStore(data, {"job_satisfaction_bin": binned("job_satisfaction_score", 6)})
+        plot_data = store.frame(["actual_productivity_score", "job_satisfaction_bin"])
+
+    Columns and frames are shared between callers, so treat them as read-only.
+    With weak=True the store only holds a weak reference to data, so it doesn't keep
+    the frame alive; the caller must.
+    """
+
+    def __init__(self, data, features, version=None, weak=False):
+        self._data = weakref.ref(data) if weak else data
+        self._weak = weak
+        self.features = features
+        self.version = version
+        self._columns = {}
+        self._frames = {}
+        self._lock = threading.RLock()
+
+    @property
+    def data(self):
+        return self._data() if self._weak else self._data
+
+    def column(self, name):
+        # A frame can arrive with a feature already computed (e.g. aggregated per bin)
+        if name not in self.features or name in self.data.columns:
+            return self.data[name]
+        with self._lock:
+            if name not in self._columns:
+                self._columns[name] = self.features[name].compute(self.data)
+            return self._columns[name]
+
+    def frame(self, columns, dropna=True):
+        """Base and derived columns side by side, without rows missing any of them when dropna."""
+        key = (tuple(columns), dropna)
+        with self._lock:
+            if key not in self._frames:
+                frame = pd.DataFrame({name: self.column(name) for name in columns}, index=self.data.index)
+                self._frames[key] = frame.dropna() if dropna else frame
+            return self._frames[key]
+
+
+# Stores for frames that aren't held in a Streamlit cache, e.g. a batch export
+_stores = OrderedDict()
+# Reentrant: a frame collected while this thread holds the lock drops its entry under it
+_stores_lock = threading.RLock()
+MAX_STORES = 8
+
+
+def _drop_store(key):
+    with _stores_lock:
+        _stores.pop(key, None)
+
+
+def store_for(data, features):
+    """The DerivedStore for this frame and feature set, reused for as long as the frame lives.
+
+    The store holds the frame weakly, so its entry (and cached columns) go away with the frame.
+    """
+    key = (id(data), id(features))
+    with _stores_lock:
+        entry = _stores.get(key)
+        if entry is not None and entry[0]() is data:
+            _stores.move_to_end(key)
+            return entry[1]
+        store = DerivedStore(data, features, weak=True)
+        _stores[key] = (weakref.ref(data, lambda _: _drop_store(key)), store)
+        while len(_stores) > MAX_STORES:
+            _stores.popitem(last=False)
+        return store
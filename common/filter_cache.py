@@ -0,0 +1,71 @@
+import threading
+from collections import OrderedDict
+
+
+def frame_bytes(data):
+    """Approximate in-memory size of a DataFrame result."""
+    return int(data.memory_usage(index=True, deep=True).sum())
+
+
+class FilterCache:
+    """Bounded LRU cache of filtered DataFrames, safe to share between Streamlit sessions.
+
+    Entries are evicted least-recently-used first once either max_entries or max_bytes
+    is exceeded. Cached frames are shared, so callers must treat them as read-only.
+    """
+
+    def __init__(self, max_entries=64, max_bytes=256 * 1024 ** 2):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Compute outside the lock so one slow filter doesn't block other sessions
+        result = compute()
+        size = frame_bytes(result)
+        if size > self.max_bytes:
+            return result
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = result
+                self._sizes[key] = size
+                self.total_bytes += size
+                self._evict()
+        return result
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self.total_bytes > self.max_bytes):
+            key, _ = self._entries.popitem(last=False)
+            self.total_bytes -= self._sizes.pop(key)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+
+class FilterIndex:
+    """Precomputed per-dataset index for multiselect and range filters.
+
+    Category columns get one packed bitmap per value; range columns get a sorted
+    copy of the values plus the row order, so a range resolves with two binary
+    searches. Rows missing any of required_columns are excluded up front, which
+    replaces a dropna() after filtering. select() combines everything with bitwise
+    ANDs and returns row positions.
+    """
+
+    def __init__(self, data, category_columns=(), range_columns=(), required_columns=()):
+        self.n_rows = len(data)
+        self.complete = np.packbits(data[list(required_columns)].notna().all(axis=1).to_numpy())
+        self.bitmaps = {}
+        self.sorted_values = {}
+        self.sorted_rows = {}
+
+        for column in category_columns:
+            codes, uniques = pd.factorize(data[column], use_na_sentinel=True)
+            self.bitmaps[column] = {
+                value: np.packbits(codes == code) for code, value in enumerate(uniques)
+            }
+
+        for column in range_columns:
+            # NaN sorts to the end, so it never falls inside a finite range
+            values = data[column].to_numpy(dtype="float64", na_value=np.nan)
+            order = np.argsort(values, kind="stable")
+            self.sorted_values[column] = values[order]
+            self.sorted_rows[column] = order
+
+    def empty(self):
+        return np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+
+    def category_bitmap(self, column, values):
+        """OR of the bitmaps for the selected values of one column."""
+        result = self.empty()
+        for value in values:
+            bitmap = self.bitmaps[column].get(value)
+            if bitmap is not None:
+                np.bitwise_or(result, bitmap, out=result)
+        return result
+
+    def range_bitmap(self, column, low, high):
+        """Bitmap of rows with low <= value <= high."""
+        values = self.sorted_values[column]
+        start = np.searchsorted(values, low, side="left")
+        stop = np.searchsorted(values, high, side="right")
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.sorted_rows[column][start:stop]] = True
+        return np.packbits(mask)
+
+    def select(self, categories=None, ranges=None):
+        """Row positions matching every category selection and every inclusive range."""
+        result = self.complete.copy()
+        for column, values in (categories or {}).items():
+            np.bitwise_and(result, self.category_bitmap(column, values), out=result)
+        for column, (low, high) in (ranges or {}).items():
+            np.bitwise_and(result, self.range_bitmap(column, low, high), out=result)
+        return np.flatnonzero(np.unpackbits(result, count=self.n_rows))
@@ -0,0 +1,16 @@
+from common.chunked import GroupMoments
+
+
+def grouped_summary(data, by, metrics):
+    """Mean, count, std and missing count of every metric per group, in one grouped scan.
+
+    Returns a long table with one row per (group, metric):
+        <by>, metric, mean, count, std, missing
+
+    The whole frame is a single GroupMoments chunk, so this and the chunked --stream
+    path share one implementation of the shifted one-pass variance.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    moments = GroupMoments(by, metrics)
+    moments.update(data)
+    return moments.summary()
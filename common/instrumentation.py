@@ -0,0 +1,175 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import altair as alt
+import pandas as pd
+import streamlit as st
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Process-wide cache counters: function name -> {"calls": n, "misses": n}
+CACHE_STATS = {}
+_cache_lock = threading.Lock()
+
+
+def profiling_enabled():
+    """Profile when the page is opened with ?profile=1 or STREAMLIT_PROFILE=1 is set."""
+    return st.query_params.get("profile") == "1" or os.environ.get("STREAMLIT_PROFILE") == "1"
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where it can't be read."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def _count(name, key):
+    with _cache_lock:
+        stats = CACHE_STATS.setdefault(name, {"calls": 0, "misses": 0})
+        stats[key] += 1
+
+
+def tracked_cache(cache=st.cache_data, **cache_kwargs):
+    """Drop-in for @st.cache_data / @st.cache_resource that also counts hits and misses.
+
+    The wrapped body only runs on a miss, so misses are counted inside it and
+    hits are calls minus misses.
+    """
+    def decorator(function):
+        name = function.__qualname__
+
+        @functools.wraps(function)
+        def on_miss(*args, **kwargs):
+            _count(name, "misses")
+            return function(*args, **kwargs)
+
+        cached = cache(**cache_kwargs)(on_miss) if cache_kwargs else cache(on_miss)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            _count(name, "calls")
+            return cached(*args, **kwargs)
+
+        wrapper.clear = cached.clear
+        wrapper.__wrapped__ = function
+        return wrapper
+    return decorator
+
+
+def cache_snapshot():
+    with _cache_lock:
+        return {name: dict(stats) for name, stats in CACHE_STATS.items()}
+
+
+class Profiler:
+    """Named, nestable timing spans for one Streamlit rerun."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.chart_bytes = {}
+        self.cache_before = cache_snapshot()
+        self._depth = 0
+
+    @contextmanager
+    def span(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.spans.append({
+                "name": name,
+                "depth": self._depth,
+                "start_ms": (start - self.origin) * 1000,
+                "duration_ms": (time.perf_counter() - start) * 1000,
+            })
+
+    def altair_chart(self, name, chart, **kwargs):
+        """st.altair_chart with separate validation and serialization spans and spec bytes."""
+        if not self.enabled:
+            return st.altair_chart(chart, **kwargs)
+        with self.span(f"validate {name}"), alt.data_transformers.disable_max_rows():
+            spec = chart.to_dict()
+        self.chart_bytes[name] = len(json.dumps(spec))
+        with self.span(f"serialize {name}"):
+            return st.altair_chart(chart, **kwargs)
+
+    def cache_activity(self):
+        """Cache calls and misses during this rerun, per cached function."""
+        rows = []
+        for name, stats in cache_snapshot().items():
+            before = self.cache_before.get(name, {"calls": 0, "misses": 0})
+            calls = stats["calls"] - before["calls"]
+            misses = stats["misses"] - before["misses"]
+            rows.append({"function": name, "hits": calls - misses, "misses": misses})
+        return rows
+
+    def chrome_trace(self):
+        """The spans as Chrome trace events (load in chrome://tracing or Perfetto)."""
+        pid = os.getpid()
+        tid = threading.get_ident()
+        events = [{
+            "name": span["name"], "ph": "X", "pid": pid, "tid": tid,
+            "ts": span["start_ms"] * 1000, "dur": span["duration_ms"] * 1000,
+        } for span in sorted(self.spans, key=lambda span: span["start_ms"])]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def render_panel(self, container=None, title="Rerun profile"):
+        """Collapsible panel summarising the rerun that just finished, in the sidebar by default.
+
+        A fragment can't write to the sidebar, so it passes its own container (e.g. st).
+        With STREAMLIT_TRACE_DIR set, every profiled rerun is also written there as a trace file.
+        """
+        if not self.enabled:
+            return
+        trace_dir = os.environ.get("STREAMLIT_TRACE_DIR")
+        if trace_dir:
+            os.makedirs(trace_dir, exist_ok=True)
+            self.dump_trace(os.path.join(trace_dir, f"rerun-{time.time_ns()}-{os.getpid()}.json"))
+        total_ms = (time.perf_counter() - self.origin) * 1000
+        container = st.sidebar if container is None else container
+        with container.expander(f"⏱ {title} ({total_ms:.0f} ms)", expanded=False):
+            spans = pd.DataFrame(sorted(self.spans, key=lambda span: span["start_ms"]))
+            if not spans.empty:
+                spans["name"] = ["  " * depth + name for depth, name in zip(spans["depth"], spans["name"])]
+                st.dataframe(spans[["name", "duration_ms"]].round(1), hide_index=True)
+
+            peak = peak_rss_bytes()
+            if peak is not None:
+                st.metric("Peak RSS", f"{peak / 1024 ** 2:.0f} MB")
+            cache_rows = self.cache_activity()
+            if cache_rows:
+                st.caption("Cache hits / misses this rerun")
+                st.dataframe(pd.DataFrame(cache_rows), hide_index=True)
+            if self.chart_bytes:
+                st.caption("Chart spec size")
+                st.dataframe(pd.DataFrame(
+                    [{"chart": name, "KB": size / 1024} for name, size in self.chart_bytes.items()]
+                ).round(1), hide_index=True)
+            st.download_button("Download Chrome trace", json.dumps(self.chrome_trace()),
+                               file_name="rerun_trace.json", mime="application/json")
+
+
+def start_profiler():
+    """Create the profiler for this rerun."""
+    return Profiler(enabled=profiling_enabled())
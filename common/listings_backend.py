@@ -0,0 +1,234 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from common.listings_cache import ensure_cache
+
+try:
+    import duckdb
+except ImportError:  # the pandas backend still works
+    duckdb = None
+
+# Columns the dashboards filter and chart on
+LISTING_COLUMNS = ['price', 'beds', 'estimated_occupancy_l365d', 'neighbourhood_cleansed', 'room_type']
+REQUIRED_COLUMNS = ['price', 'beds', 'estimated_occupancy_l365d', 'neighbourhood_cleansed']
+POINT_COLUMNS = ['price', 'estimated_occupancy_l365d', 'beds', 'room_type']
+
+
+def make_filters(beds, price, occupancy, neighbourhoods):
+    """The sidebar state every backend query takes: three (low, high) ranges and a neighbourhood list."""
+    return {
+        "beds": tuple(beds),
+        "price": tuple(price),
+        "occupancy": tuple(occupancy),
+        "neighbourhoods": tuple(neighbourhoods),
+    }
+
+
+def parquet_files(path):
+    """Parquet files for a listings source: a CSV's cache, or partition files as they are.
+
+    path is one source or a list of them, e.g. the partitions selected from a ListingsStore.
+    """
+    paths = path if isinstance(path, (list, tuple)) else [path]
+    return [p if p.endswith(".parquet") else ensure_cache(p) for p in paths]
+
+
+class PandasBackend:
+    """Filters and aggregates an in-memory frame; the reference for the other backends."""
+
+    name = "pandas"
+
+    def __init__(self, path):
+        frames = [pq.read_table(file, columns=LISTING_COLUMNS, memory_map=True).to_pandas()
+                  for file in parquet_files(path)]
+        data = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        data = data.dropna(subset=REQUIRED_COLUMNS)
+        data['beds'] = data['beds'].astype(int)
+        data['estimated_occupancy_l365d'] = data['estimated_occupancy_l365d'].astype(float)
+        self.data = data
+        self._bounds = None
+
+    def bounds(self):
+        """Slider ranges and neighbourhood choices for the whole dataset."""
+        if self._bounds is None:
+            data = self.data
+            self._bounds = {
+                "beds": (int(data['beds'].min()), int(data['beds'].max())),
+                "price": (int(data['price'].min()), int(data['price'].max())),
+                "occupancy": (0, int(data['estimated_occupancy_l365d'].max())),
+                "neighbourhoods": sorted(data['neighbourhood_cleansed'].unique()),
+            }
+        return self._bounds
+
+    def _filtered(self, filters):
+        data = self.data
+        return data[
+            data['beds'].between(*filters["beds"]) &
+            data['price'].between(*filters["price"]) &
+            data['estimated_occupancy_l365d'].between(*filters["occupancy"]) &
+            data['neighbourhood_cleansed'].isin(filters["neighbourhoods"])
+        ]
+
+    def count(self, filters):
+        return len(self._filtered(filters))
+
+    def occupancy_by_beds(self, filters):
+        grouped = self._filtered(filters).groupby('beds')['estimated_occupancy_l365d'].mean()
+        return grouped.rename('avg_occupancy').reset_index()
+
+    def count_by_beds(self, filters):
+        return self._filtered(filters).groupby('beds').size().rename('count').reset_index()
+
+    def count_by_room_type(self, filters):
+        counts = self._filtered(filters).groupby('room_type', observed=True).size()
+        return counts.rename('count').reset_index()
+
+    def points(self, filters, limit=None):
+        """Rows for the scatter plot; a uniform sample of `limit` rows when more match."""
+        rows = self._filtered(filters)[POINT_COLUMNS]
+        if limit is not None and len(rows) > limit:
+            rows = rows.sample(n=limit, random_state=0)
+        return rows
+
+    def density_grid(self, filters, x, y, bins=40):
+        from common.lod import density_grid
+        return density_grid(self._filtered(filters), x, y, bins)
+
+
+class DuckDBBackend:
+    """Runs the filters and per-chart aggregations in embedded DuckDB over the Parquet cache.
+
+    Only result sets come back to Python: a few rows per bar chart and at most `limit`
+    points for the scatter. DuckDB pushes the predicates into the Parquet scan and
+    spreads it over all cores, so the same queries work on multi-million-row snapshots.
+    """
+
+    name = "duckdb"
+
+    def __init__(self, path):
+        if duckdb is None:
+            raise ImportError("The duckdb backend needs the duckdb package (pip install duckdb)")
+        files = ", ".join("'" + file.replace("'", "''") + "'" for file in parquet_files(path))
+        self.connection = duckdb.connect()
+        self.connection.execute(f"""
+            CREATE VIEW listings AS
+            SELECT CAST(beds AS INTEGER) AS beds, price,
+                   CAST(estimated_occupancy_l365d AS DOUBLE) AS estimated_occupancy_l365d,
+                   neighbourhood_cleansed, room_type
+            FROM read_parquet([{files}], union_by_name = true)
+            WHERE {' AND '.join(f'{column} IS NOT NULL' for column in REQUIRED_COLUMNS)}
+        """)
+        self._lock = threading.Lock()
+        self._bounds = None
+
+    def _query(self, sql, parameters=()):
+        # One cursor per query, so Streamlit sessions on different threads can share the backend
+        with self._lock:
+            cursor = self.connection.cursor()
+        try:
+            return cursor.execute(sql, list(parameters)).df()
+        finally:
+            cursor.close()
+
+    def _where(self, filters):
+        clause = ("beds BETWEEN ? AND ? AND price BETWEEN ? AND ? "
+                  "AND estimated_occupancy_l365d BETWEEN ? AND ? "
+                  "AND list_contains(?, neighbourhood_cleansed)")
+        return clause, [*filters["beds"], *filters["price"], *filters["occupancy"],
+                        list(filters["neighbourhoods"])]
+
+    def bounds(self):
+        if self._bounds is None:
+            ranges = self._query("""
+                SELECT min(beds) AS beds_min, max(beds) AS beds_max,
+                       min(price) AS price_min, max(price) AS price_max,
+                       max(estimated_occupancy_l365d) AS occupancy_max
+                FROM listings
+            """).iloc[0]
+            neighbourhoods = self._query(
+                "SELECT DISTINCT neighbourhood_cleansed FROM listings ORDER BY 1")
+            self._bounds = {
+                "beds": (int(ranges['beds_min']), int(ranges['beds_max'])),
+                "price": (int(ranges['price_min']), int(ranges['price_max'])),
+                "occupancy": (0, int(ranges['occupancy_max'])),
+                "neighbourhoods": neighbourhoods['neighbourhood_cleansed'].tolist(),
+            }
+        return self._bounds
+
+    def count(self, filters):
+        where, parameters = self._where(filters)
+        return int(self._query(f"SELECT count(*) AS n FROM listings WHERE {where}", parameters)['n'].iloc[0])
+
+    def occupancy_by_beds(self, filters):
+        where, parameters = self._where(filters)
+        return self._query(f"""
+            SELECT beds, avg(estimated_occupancy_l365d) AS avg_occupancy
+            FROM listings WHERE {where} GROUP BY beds ORDER BY beds
+        """, parameters)
+
+    def count_by_beds(self, filters):
+        where, parameters = self._where(filters)
+        return self._query(f"""
+            SELECT beds, count(*) AS count
+            FROM listings WHERE {where} GROUP BY beds ORDER BY beds
+        """, parameters)
+
+    def count_by_room_type(self, filters):
+        where, parameters = self._where(filters)
+        return self._query(f"""
+            SELECT room_type, count(*) AS count
+            FROM listings WHERE {where} GROUP BY room_type ORDER BY room_type
+        """, parameters)
+
+    def points(self, filters, limit=None):
+        where, parameters = self._where(filters)
+        sql = f"SELECT {', '.join(POINT_COLUMNS)} FROM listings WHERE {where}"
+        if limit is not None:
+            sql = f"SELECT * FROM ({sql}) USING SAMPLE reservoir({int(limit)} ROWS) REPEATABLE (0)"
+        return self._query(sql, parameters)
+
+    def density_grid(self, filters, x, y, bins=40):
+        """Same cells and columns as common.lod.density_grid, counted in SQL."""
+        where, parameters = self._where(filters)
+        cells = self._query(f"""
+            WITH rows AS (SELECT {x} AS x, {y} AS y FROM listings WHERE {where}),
+                 extent AS (SELECT min(x) AS x0, max(x) AS x1, min(y) AS y0, max(y) AS y1 FROM rows)
+            SELECT least(greatest(coalesce(floor((x - x0) / nullif(x1 - x0, 0) * {bins}), 0), 0), {bins - 1}) AS x_code,
+                   least(greatest(coalesce(floor((y - y0) / nullif(y1 - y0, 0) * {bins}), 0), 0), {bins - 1}) AS y_code,
+                   count(*) AS count, any_value(x0) AS x0, any_value(x1) AS x1,
+                   any_value(y0) AS y0, any_value(y1) AS y1
+            FROM rows, extent GROUP BY ALL
+        """, parameters)
+        if cells.empty:
+            return pd.DataFrame(columns=[f"{x}_start", f"{x}_end", f"{y}_start", f"{y}_end", "count"])
+        first = cells.iloc[0]
+        x_edges = np.linspace(first['x0'], first['x1'], bins + 1)
+        y_edges = np.linspace(first['y0'], first['y1'], bins + 1)
+        x_codes = cells['x_code'].to_numpy(dtype=int)
+        y_codes = cells['y_code'].to_numpy(dtype=int)
+        return pd.DataFrame({
+            f"{x}_start": x_edges[x_codes],
+            f"{x}_end": x_edges[x_codes + 1],
+            f"{y}_start": y_edges[y_codes],
+            f"{y}_end": y_edges[y_codes + 1],
+            "count": cells['count'].to_numpy(),
+        })
+
+
+BACKENDS = {
+    "pandas": PandasBackend,
+    "duckdb": DuckDBBackend,
+}
+
+
+def default_backend():
+    """LISTINGS_BACKEND if set, otherwise DuckDB when it is installed."""
+    return os.environ.get("LISTINGS_BACKEND") or ("duckdb" if duckdb is not None else "pandas")
+
+
+def open_backend(path, name=None):
+    return BACKENDS[name or default_backend()](path)
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from common.compact_loader import LISTINGS_SCHEMA, compact_frame
+
+CACHE_DIR_NAME = ".data_cache"
+CACHE_VERSION = 2
+
+
+def resolve_source(path):
+    """Return the listings file to read, falling back to the gzipped copy."""
+    if os.path.exists(path):
+        return path
+    if os.path.exists(path + ".gz"):
+        return path + ".gz"
+    raise FileNotFoundError(path)
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a file, read in chunks so large snapshots don't sit in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_paths(source):
+    """Parquet file and metadata sidecar for a given source file."""
+    folder = os.path.join(os.path.dirname(os.path.abspath(source)), CACHE_DIR_NAME)
+    stem = os.path.basename(source).split(".")[0]
+    return os.path.join(folder, stem + ".parquet"), os.path.join(folder, stem + ".meta.json")
+
+
+def clean_listings(data):
+    """Apply the cleaning the dashboards used to redo on every rerun."""
+    if not pd.api.types.is_numeric_dtype(data["price"]):
+        data["price"] = data["price"].replace(r"[\$,]", "", regex=True).astype(float)
+    # Integer beds, categorical neighbourhood/room type and narrowed numerics
+    return compact_frame(data, LISTINGS_SCHEMA)
+
+
+def read_meta(meta_path):
+    try:
+        with open(meta_path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def write_meta(meta_path, meta):
+    with open(meta_path, "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+def build_cache(source, parquet_path, meta_path, source_hash):
+    """Parse the CSV once and write the typed Parquet cache."""
+    data = clean_listings(pd.read_csv(source, low_memory=False))
+    os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    # Write to a temp file first so a crashed ingest never leaves a half-written cache
+    tmp_path = parquet_path + ".tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, parquet_path)
+    stat = os.stat(source)
+    write_meta(meta_path, {
+        "version": CACHE_VERSION,
+        "source": os.path.abspath(source),
+        "source_mtime": stat.st_mtime,
+        "source_size": stat.st_size,
+        "source_hash": source_hash,
+        "rows": table.num_rows,
+    })
+
+
+def ensure_cache(path):
+    """Make sure an up-to-date Parquet cache exists for the listings file and return its path.
+
+    The cheap mtime/size check runs first; the file is only hashed when those change,
+    and the cache is only rebuilt when the hash changes too.
+    """
+    source = resolve_source(path)
+    parquet_path, meta_path = cache_paths(source)
+    stat = os.stat(source)
+    meta = read_meta(meta_path)
+
+    if (meta is not None and meta.get("version") == CACHE_VERSION
+            and os.path.exists(parquet_path)):
+        if meta["source_mtime"] == stat.st_mtime and meta["source_size"] == stat.st_size:
+            return parquet_path
+        source_hash = file_hash(source)
+        if meta["source_hash"] == source_hash:
+            # Touched but unchanged, so just record the new mtime
+            meta["source_mtime"] = stat.st_mtime
+            meta["source_size"] = stat.st_size
+            write_meta(meta_path, meta)
+            return parquet_path
+    else:
+        source_hash = file_hash(source)
+
+    build_cache(source, parquet_path, meta_path, source_hash)
+    return parquet_path
@@ -0,0 +1,179 @@
+import argparse
+import json
+import os
+import re
+import sys
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.listings_backend import REQUIRED_COLUMNS
+from common.listings_cache import ensure_cache
+
+CATALOG_NAME = "_catalog.json"
+CATALOG_VERSION = 1
+
+
+def slug(name):
+    """Directory-safe partition value, e.g. 'New York City' -> 'new-york-city'."""
+    return re.sub(r"[^a-z0-9]+", "-", str(name).lower()).strip("-")
+
+
+def snapshot_date(data):
+    """Scrape date of a snapshot: the date part of its scrape_id, else the latest last_scraped."""
+    if "scrape_id" in data and data["scrape_id"].notna().any():
+        digits = str(int(data["scrape_id"].dropna().iloc[0]))[:8]
+        return f"{digits[:4]}-{digits[4:6]}-{digits[6:8]}"
+    return str(pd.to_datetime(data["last_scraped"]).max().date())
+
+
+def partition_stats(data):
+    """What the dashboards' widgets need from a partition, so they never scan it for bounds."""
+    rows = data.dropna(subset=REQUIRED_COLUMNS)
+    return {
+        "rows": len(data),
+        "usable_rows": len(rows),
+        "scrape_id": int(data["scrape_id"].dropna().iloc[0]) if "scrape_id" in data and data["scrape_id"].notna().any() else None,
+        "beds": [int(rows["beds"].min()), int(rows["beds"].max())],
+        "price": [float(rows["price"].min()), float(rows["price"].max())],
+        "occupancy": [0, int(rows["estimated_occupancy_l365d"].max())],
+        "neighbourhoods": sorted(map(str, rows["neighbourhood_cleansed"].unique())),
+        "room_types": sorted(map(str, rows["room_type"].dropna().unique())),
+    }
+
+
+class Partition:
+    """One city's listings at one scrape date: a Parquet file plus its statistics."""
+
+    def __init__(self, city, snapshot, path, stats):
+        self.city = city
+        self.snapshot = snapshot
+        self.path = path
+        self.stats = stats
+
+    def __repr__(self):
+        return f"Partition({self.city!r}, {self.snapshot!r})"
+
+
+class ListingsStore:
+    """Listings partitioned by city and snapshot date under one root directory.
+
+    Layout:
+        <root>/city=<city>/snapshot=<YYYY-MM-DD>/listings.parquet
+        <root>/_catalog.json    partition list with per-partition statistics
+
+    Selecting partitions only reads the catalog, so the dashboards can fill their
+    selectors and widget bounds before any listings are scanned, and the query
+    backends are only ever handed the selected files.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.catalog_path = os.path.join(root, CATALOG_NAME)
+        self._catalog = None
+        self._catalog_mtime = None
+
+    def version(self):
+        """Changes whenever a partition is added or replaced; use it to key caches."""
+        try:
+            return os.path.getmtime(self.catalog_path)
+        except FileNotFoundError:
+            return None
+
+    def catalog(self):
+        mtime = self.version()
+        if mtime is None:
+            return {"version": CATALOG_VERSION, "partitions": []}
+        if mtime != self._catalog_mtime:
+            with open(self.catalog_path, "r") as f:
+                self._catalog = json.load(f)
+            self._catalog_mtime = mtime
+        return self._catalog
+
+    def partitions(self):
+        return [
+            Partition(entry["city"], entry["snapshot"], os.path.join(self.root, entry["path"]), entry["stats"])
+            for entry in self.catalog()["partitions"]
+        ]
+
+    def cities(self):
+        return sorted({partition.city for partition in self.partitions()})
+
+    def snapshots(self, city):
+        return sorted(partition.snapshot for partition in self.partitions() if partition.city == city)
+
+    def select(self, cities=None, snapshots=None):
+        """Partitions matching the cities and snapshot dates; None matches all."""
+        return [
+            partition for partition in self.partitions()
+            if (cities is None or partition.city in cities)
+            and (snapshots is None or partition.snapshot in snapshots)
+        ]
+
+    def _write_catalog(self, catalog):
+        tmp_path = self.catalog_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(catalog, f, indent=2)
+        os.replace(tmp_path, self.catalog_path)
+
+    def ingest(self, source, city):
+        """Add a listings snapshot (CSV or CSV.gz) for a city, one partition per scrape date.
+
+        Re-ingesting a snapshot replaces its partition.
+        """
+        data = pq.read_table(ensure_cache(source)).to_pandas()
+        written = []
+        catalog = self.catalog()
+        entries = {(entry["city"], entry["snapshot"]): entry for entry in catalog["partitions"]}
+        groups = data.groupby("scrape_id", dropna=False) if "scrape_id" in data else [(None, data)]
+        for _, rows in groups:
+            snapshot = snapshot_date(rows)
+            relative = os.path.join(f"city={slug(city)}", f"snapshot={snapshot}", "listings.parquet")
+            path = os.path.join(self.root, relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            pq.write_table(pa.Table.from_pandas(rows, preserve_index=False), tmp_path)
+            os.replace(tmp_path, path)
+            entries[(slug(city), snapshot)] = {
+                "city": slug(city),
+                "snapshot": snapshot,
+                "path": relative,
+                "source": os.path.abspath(source),
+                "stats": partition_stats(rows),
+            }
+            written.append(Partition(slug(city), snapshot, path, entries[(slug(city), snapshot)]["stats"]))
+        self._write_catalog({
+            "version": CATALOG_VERSION,
+            "partitions": [entries[key] for key in sorted(entries)],
+        })
+        return written
+
+
+def merge_bounds(partitions):
+    """Widget bounds for a set of partitions, in the shape the query backends' bounds() return."""
+    stats = [partition.stats for partition in partitions]
+    return {
+        "beds": (min(s["beds"][0] for s in stats), max(s["beds"][1] for s in stats)),
+        "price": (int(min(s["price"][0] for s in stats)), int(max(s["price"][1] for s in stats))),
+        "occupancy": (0, max(s["occupancy"][1] for s in stats)),
+        "neighbourhoods": sorted(set().union(*(s["neighbourhoods"] for s in stats))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add Inside Airbnb listings snapshots to a partitioned store.")
+    parser.add_argument("sources", nargs="+", help="listings.csv / listings.csv.gz files of one city")
+    parser.add_argument("--city", required=True, help="City the snapshots belong to")
+    parser.add_argument("--root", required=True, help="Store directory")
+    args = parser.parse_args()
+
+    store = ListingsStore(args.root)
+    for source in args.sources:
+        for partition in store.ingest(source, args.city):
+            print(f"{partition.city} {partition.snapshot}: {partition.stats['rows']:,} listings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Scatter plots with more rows than this are drawn from a sample (or as a density grid).
+# Override per call, or for a whole run with the LOD_MAX_POINTS environment variable.
+MAX_POINTS = int(os.environ.get("LOD_MAX_POINTS", 5000))
+
+# Share of the point budget reserved for outliers
+OUTLIER_SHARE = 0.1
+
+
+def outlier_mask(data, columns, low=0.01, high=0.99):
+    """Rows outside the [low, high] quantiles of any of the columns."""
+    mask = np.zeros(len(data), dtype=bool)
+    for column in columns:
+        values = data[column]
+        lower, upper = values.quantile([low, high])
+        mask |= ((values < lower) | (values > upper)).to_numpy(dtype=bool, na_value=False)
+    return mask
+
+
+def stratified_sample(data, size, strata, rng):
+    """Proportional sample per stratum, keeping at least one row of every stratum."""
+    if strata is None:
+        return data.sample(n=min(size, len(data)), random_state=rng)
+    fraction = size / len(data)
+    keys = pd.Series(rng.random(len(data)), index=data.index)
+    rank = keys.groupby(data[strata], observed=True, dropna=False)
+    keep = (rank.rank(pct=True) <= fraction) | (rank.rank(method="first") == 1)
+    return data[keep.to_numpy()]
+
+
+def grid_sample(data, size, x, y, rng):
+    """One random point per occupied cell of a roughly size-cell grid over x and y."""
+    cells = max(1, int(np.sqrt(size)))
+    shuffled = data.sample(frac=1, random_state=rng)
+    keys = np.zeros(len(shuffled), dtype=np.int64)
+    for column in (x, y):
+        values = shuffled[column].to_numpy(dtype="float64", na_value=np.nan)
+        low, high = np.nanmin(values), np.nanmax(values)
+        span = (high - low) or 1.0
+        codes = np.clip(((values - low) / span * cells).astype(np.int64, copy=False), 0, cells - 1)
+        keys = keys * cells + codes
+    sample = shuffled[~pd.Series(keys).duplicated().to_numpy()]
+    if len(sample) > size:
+        sample = sample.sample(n=size, random_state=rng)
+    return sample
+
+
+def sample_points(data, x, y, max_points=None, strata=None, method="stratified", random_state=0):
+    """Cap a scatter plot's rows at max_points while keeping its outliers.
+
+    Returns (rows, approximate). Up to OUTLIER_SHARE of the budget goes to points
+    outside the 1st-99th percentile of x or y; the rest is a stratified sample
+    (proportional per value of `strata`) or a grid sample (one point per cell).
+    """
+    max_points = max_points or MAX_POINTS
+    data = data.dropna(subset=[x, y])
+    if len(data) <= max_points:
+        return data, False
+    rng = np.random.default_rng(random_state)
+
+    mask = outlier_mask(data, [x, y])
+    outliers = data[mask]
+    outlier_budget = int(max_points * OUTLIER_SHARE)
+    if len(outliers) > outlier_budget:
+        outliers = outliers.sample(n=outlier_budget, random_state=rng)
+    remaining = data[~mask]
+    budget = max_points - len(outliers)
+
+    if method == "grid":
+        sampled = grid_sample(remaining, budget, x, y, rng)
+    elif method == "stratified":
+        sampled = stratified_sample(remaining, budget, strata, rng)
+    else:
+        raise ValueError(f"Unknown sampling method: {method!r}")
+    return pd.concat([outliers, sampled]).sort_index(), True
+
+
+def density_grid(data, x, y, bins=40):
+    """Bin x and y into a bins x bins grid and count the points in each occupied cell."""
+    data = data.dropna(subset=[x, y])
+    columns = {}
+    codes = []
+    for column in (x, y):
+        values = data[column].to_numpy(dtype="float64")
+        edges = np.linspace(values.min(), values.max(), bins + 1)
+        code = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, bins - 1)
+        codes.append(code)
+        columns[column] = edges
+    counts = pd.DataFrame({"x_code": codes[0], "y_code": codes[1]}).value_counts().reset_index(name="count")
+    x_edges, y_edges = columns[x], columns[y]
+    return pd.DataFrame({
+        f"{x}_start": x_edges[counts["x_code"]],
+        f"{x}_end": x_edges[counts["x_code"] + 1],
+        f"{y}_start": y_edges[counts["y_code"]],
+        f"{y}_end": y_edges[counts["y_code"] + 1],
+        "count": counts["count"].to_numpy(),
+    })
+
+
+def approximate_title(title, shown, total):
+    return f"{title} (approximate: {shown:,} of {total:,} points)"
+
+
+def population(data, x, y):
+    """Rows with both x and y present, counted in the table data was sampled from.
+
+    A frame that is already a sample of a larger table (e.g. from a chunked pass over
+    a big file) carries those counts as data.attrs["population"]["<x>|<y>"].
+    """
+    counts = data.attrs.get("population", {})
+    if f"{x}|{y}" in counts:
+        return counts[f"{x}|{y}"]
+    return int(data[[x, y]].notna().all(axis=1).sum())
+
+
+def lod_points(data, x, y, title, strata=None, max_points=None, method="stratified"):
+    """Sampled rows plus a title that says when the view is approximate."""
+    total = population(data, x, y)
+    rows, approximate = sample_points(data, x, y, max_points, strata, method)
+    if approximate or len(rows) < total:
+        title = approximate_title(title, len(rows), total)
+    return rows, title
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+from common.derived import neg_log10_values
+
+ID_COLUMNS = ["Bacteria", "Gram_Staining", "Genus"]
+
+
+class MICMatrix:
+    """MIC values as a strain x antibiotic float array, with the strain attributes alongside.
+
+    Every view (one antibiotic, best per strain, resistance counts, rollups) is
+    a NumPy operation on the matrix, so nothing is melted or grouped per request:
+
+        matrix = MICMatrix.from_wide(pd.read_csv("bacteriaWithSpacer.csv"))
+        best = matrix.view()                  # most effective antibiotic per strain
+        penicillin = matrix.view("Penicillin")
+
+    Rows keep the order of the source file; `codes` is each strain's position in it.
+    """
+
+    def __init__(self, strains, antibiotics, mic):
+        self.strains = strains.reset_index(drop=True)
+        self.antibiotics = list(antibiotics)
+        self.mic = mic
+        # -log10(MIC): a smaller MIC scores higher
+        self.effectiveness = neg_log10_values(mic)
+        self.order = pd.Categorical(self.strains["Bacteria"], categories=pd.unique(self.strains["Bacteria"]))
+
+    @classmethod
+    def from_wide(cls, data, id_columns=ID_COLUMNS, antibiotics=None):
+        """One row per strain and one MIC column per antibiotic; any numeric non-id column counts as one."""
+        if antibiotics is None:
+            antibiotics = [column for column in data.columns
+                           if column not in id_columns and pd.api.types.is_numeric_dtype(data[column])]
+        mic = data[antibiotics].apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        return cls(data[list(id_columns)], antibiotics, mic)
+
+    @property
+    def codes(self):
+        return self.order.codes
+
+    def _scores(self):
+        return np.where(np.isnan(self.effectiveness), -np.inf, self.effectiveness)
+
+    def best(self):
+        """Column of the most effective antibiotic per strain, -1 where no MIC was measured."""
+        scores = self._scores()
+        best = scores.argmax(axis=1)
+        return np.where(np.isneginf(scores.max(axis=1)), -1, best)
+
+    def resistant(self, threshold):
+        """Boolean matrix: MIC at or above the threshold (missing MICs are never resistant)."""
+        with np.errstate(invalid="ignore"):
+            return self.mic >= threshold
+
+    def resistant_counts(self, threshold):
+        """Number of antibiotics each strain resists, in row order."""
+        return self.resistant(threshold).sum(axis=1)
+
+    def rollup(self, threshold, by="Gram_Staining"):
+        """Per group and antibiotic: strains tested, resistant strains, their share and mean effectiveness."""
+        groups, labels = pd.factorize(self.strains[by], sort=True)
+        tested = ~np.isnan(self.mic)
+        resistant = self.resistant(threshold)
+        effectiveness = np.where(tested, np.nan_to_num(self.effectiveness), 0.0)
+        valid = groups >= 0
+        shape = (len(labels), len(self.antibiotics))
+
+        def totals(values):
+            out = np.zeros(shape)
+            np.add.at(out, groups[valid], values[valid])
+            return out
+
+        n_tested, n_resistant, total = totals(tested), totals(resistant), totals(effectiveness)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            share = n_resistant / n_tested
+            mean = total / n_tested
+        return pd.DataFrame({
+            by: np.repeat(np.asarray(labels), len(self.antibiotics)),
+            "Antibiotic": np.tile(self.antibiotics, len(labels)),
+            "Tested": n_tested.ravel().astype(int),
+            "Resistant": n_resistant.ravel().astype(int),
+            "Resistant Share": share.ravel(),
+            "Mean Effectiveness": mean.ravel(),
+        })
+
+    def view(self, antibiotic=None):
+        """One row per strain for one antibiotic, or for each strain's most effective one.
+
+        Columns: the id columns, Antibiotic, MIC and Effectiveness, in source order.
+        Strains without any MIC are left out of the best-per-strain view.
+        """
+        rows = np.arange(len(self.strains))
+        if antibiotic is None:
+            columns = self.best()
+            keep = columns >= 0
+            rows, columns = rows[keep], columns[keep]
+        else:
+            columns = np.full(len(rows), self.antibiotics.index(antibiotic))
+        view = self.strains.iloc[rows].reset_index(drop=True)
+        view["Antibiotic"] = np.asarray(self.antibiotics, dtype=object)[columns]
+        view["MIC"] = self.mic[rows, columns]
+        view["Effectiveness"] = self.effectiveness[rows, columns]
+        view.index = rows
+        return view
+
+    def sort_keys(self, rows, positions=None):
+        """'<position>_<name>' labels that sort in source order, zero-padded for any strain count.
+
+        positions overrides the source order, e.g. with each row's place in a grouped listing.
+        """
+        positions = self.codes[rows] if positions is None else np.asarray(positions)
+        width = len(str(max(len(self.order.categories) - 1, 0)))
+        return (pd.Series(positions).astype(str).str.zfill(max(width, 3))
+                + "_" + self.strains["Bacteria"].to_numpy()[rows]).to_numpy()
@@ -0,0 +1,434 @@
+import ast
+import io
+import math
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from common.chart_data import prune_chart_data
+
+
+class Unsupported(Exception):
+    """A transform, expression or encoding this pass can't evaluate in pandas."""
+
+
+# ---------------------------------------------------------------------------
+# Vega expressions
+# ---------------------------------------------------------------------------
+# Filter and calculate expressions are rewritten into Python syntax (datum.x already
+# parses as an attribute access) and evaluated column-wise over the DataFrame.
+
+# Longest first, so === isn't read as == followed by =. JS ! becomes Python ~, which
+# binds tighter than comparisons just like !, and is evaluated as a logical not.
+JS_OPERATORS = [("===", "=="), ("!==", "!="), ("&&", " and "), ("||", " or "), ("!=", "!="), ("!", " ~")]
+
+FUNCTIONS = {
+    "abs": np.abs, "ceil": np.ceil, "floor": np.floor, "round": np.round,
+    "sqrt": np.sqrt, "exp": np.exp, "log": np.log, "pow": np.power,
+    "min": np.minimum, "max": np.maximum,
+    "isValid": lambda value: pd.Series(value).notna(),
+}
+CONSTANTS = {"null": np.nan, "NaN": np.nan, "PI": math.pi, "E": math.e, "true": True, "false": False}
+
+BINARY = {
+    ast.Add: lambda a, b: a + b, ast.Sub: lambda a, b: a - b,
+    ast.Mult: lambda a, b: a * b, ast.Div: lambda a, b: a / b,
+    # JavaScript's % keeps the sign of the dividend, like C fmod and unlike Python's floor mod
+    ast.Mod: lambda a, b: np.fmod(a, b),
+}
+COMPARE = {
+    ast.Lt: lambda a, b: a < b, ast.LtE: lambda a, b: a <= b,
+    ast.Gt: lambda a, b: a > b, ast.GtE: lambda a, b: a >= b,
+    ast.Eq: lambda a, b: a == b, ast.NotEq: lambda a, b: a != b,
+}
+
+
+def translate_operators(expr):
+    """Swap JavaScript operators for Python ones, leaving string literals untouched."""
+    out = []
+    i = 0
+    while i < len(expr):
+        char = expr[i]
+        if char in "'\"":
+            end = i + 1
+            while end < len(expr) and expr[end] != char:
+                end += 2 if expr[end] == "\\" else 1
+            if end >= len(expr):
+                raise Unsupported(f"unterminated string in {expr!r}")
+            out.append(expr[i:end + 1])
+            i = end + 1
+            continue
+        for js, python in JS_OPERATORS:
+            if expr.startswith(js, i):
+                out.append(python)
+                i += len(js)
+                break
+        else:
+            out.append(char)
+            i += 1
+    return "".join(out)
+
+
+def parse_expression(expr):
+    source = translate_operators(expr)
+    try:
+        return ast.parse(source.strip(), mode="eval").body
+    except SyntaxError as e:
+        raise Unsupported(f"can't parse expression {expr!r}") from e
+
+
+def _as_number(value):
+    # JavaScript coerces null to 0 in arithmetic and in <, <=, >, >=
+    if isinstance(value, pd.Series) and pd.api.types.is_numeric_dtype(value):
+        return value.fillna(0)
+    return value
+
+
+def _as_mask(value, data):
+    if isinstance(value, pd.Series):
+        return value.fillna(False).astype(bool)
+    return pd.Series(bool(value), index=data.index)
+
+
+def evaluate(node, data):
+    """Evaluate one parsed expression node against every row of data."""
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id in CONSTANTS:
+            return CONSTANTS[node.id]
+        raise Unsupported(f"unknown name {node.id!r}")
+    if isinstance(node, (ast.Attribute, ast.Subscript)):
+        if not (isinstance(node.value, ast.Name) and node.value.id == "datum"):
+            raise Unsupported("only datum fields can be accessed")
+        field = node.attr if isinstance(node, ast.Attribute) else getattr(node.slice, "value", None)
+        if field not in data.columns:
+            raise Unsupported(f"unknown field {field!r}")
+        return data[field]
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY:
+        return BINARY[type(node.op)](_as_number(evaluate(node.left, data)),
+                                     _as_number(evaluate(node.right, data)))
+    if isinstance(node, ast.UnaryOp):
+        value = evaluate(node.operand, data)
+        if isinstance(node.op, ast.USub):
+            return -_as_number(value)
+        if isinstance(node.op, ast.Invert):
+            return ~_as_mask(value, data)
+    if isinstance(node, ast.BoolOp):
+        masks = [_as_mask(evaluate(value, data), data) for value in node.values]
+        result = masks[0]
+        for mask in masks[1:]:
+            result = (result & mask) if isinstance(node.op, ast.And) else (result | mask)
+        return result
+    if isinstance(node, ast.Compare):
+        result = None
+        left = evaluate(node.left, data)
+        for op, comparator in zip(node.ops, node.comparators):
+            if type(op) not in COMPARE:
+                raise Unsupported(f"unsupported comparison {type(op).__name__}")
+            right = evaluate(comparator, data)
+            if isinstance(op, (ast.Eq, ast.NotEq)):
+                step = COMPARE[type(op)](left, right)
+            else:
+                step = COMPARE[type(op)](_as_number(left), _as_number(right))
+            step = _as_mask(step, data)
+            result = step if result is None else result & step
+            left = right
+        return result
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS:
+        return FUNCTIONS[node.func.id](*[evaluate(arg, data) for arg in node.args])
+    raise Unsupported(f"unsupported expression {ast.dump(node)}")
+
+
+def evaluate_expression(expr, data):
+    result = evaluate(parse_expression(expr), data)
+    if not isinstance(result, pd.Series):
+        result = pd.Series(result, index=data.index)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Transforms
+# ---------------------------------------------------------------------------
+
+# Vega aggregate op -> function of one group's values
+AGGREGATE_OPS = {
+    "count": lambda values: len(values),
+    "valid": lambda values: int(values.notna().sum()),
+    "missing": lambda values: int(values.isna().sum()),
+    "distinct": lambda values: values.nunique(dropna=False),
+    "sum": lambda values: values.sum(),
+    "mean": lambda values: values.mean(),
+    "average": lambda values: values.mean(),
+    "median": lambda values: values.median(),
+    "min": lambda values: values.min(),
+    "max": lambda values: values.max(),
+    "stdev": lambda values: values.std(ddof=1),
+    "variance": lambda values: values.var(ddof=1),
+    "q1": lambda values: values.quantile(0.25),
+    "q3": lambda values: values.quantile(0.75),
+}
+
+
+def _aggregate_groups(data, groupby, measures):
+    """Run (op, field, as) measures per group, in order of each group's first row."""
+    for op, _, _ in measures:
+        if op not in AGGREGATE_OPS:
+            raise Unsupported(f"unsupported aggregate op {op!r}")
+    if groupby:
+        groups = data.groupby(list(groupby), sort=False, dropna=False, observed=True)
+    else:
+        groups = [((), data)]
+    rows = []
+    for key, group in groups:
+        key = key if isinstance(key, tuple) else (key,)
+        row = dict(zip(groupby, key))
+        for op, field, output in measures:
+            values = group[field] if field is not None else group.index.to_series()
+            row[output] = AGGREGATE_OPS[op](values)
+        rows.append(row)
+    return pd.DataFrame(rows, columns=list(groupby) + [output for _, _, output in measures])
+
+
+def _measures(transform, key):
+    return [(m["op"], m.get("field"), m.get("as") or f"{m['op']}_{m.get('field', '')}".rstrip("_"))
+            for m in transform[key]]
+
+
+def apply_aggregate(data, transform):
+    return _aggregate_groups(data, transform.get("groupby", []), _measures(transform, "aggregate"))
+
+
+def apply_joinaggregate(data, transform):
+    groupby = transform.get("groupby", [])
+    measures = _measures(transform, "joinaggregate")
+    summary = _aggregate_groups(data, groupby, measures)
+    if not groupby:
+        return data.assign(**{output: summary[output].iloc[0] for _, _, output in measures})
+    return data.merge(summary, on=groupby, how="left")
+
+
+def apply_filter(data, transform):
+    predicate = transform["filter"]
+    if not isinstance(predicate, str):
+        # Selection params and field predicates stay in the browser
+        raise Unsupported("only expression filters are evaluated")
+    return data[evaluate_expression(predicate, data).to_numpy()]
+
+
+def apply_calculate(data, transform):
+    return data.assign(**{transform["as"]: evaluate_expression(transform["calculate"], data)})
+
+
+def bin_params(extent, maxbins=10, step=None, steps=None, base=10, divide=(5, 2),
+               minstep=0, nice=True, span=None, **unsupported):
+    """Bin start, stop and step exactly as Vega's bin() computes them."""
+    if unsupported:
+        raise Unsupported(f"unsupported bin options {sorted(unsupported)}")
+    low, high = extent
+    logb = math.log(base)
+    span = span or (high - low) or abs(low) or 1
+    if step is None and steps:
+        target = span / maxbins
+        i = 0
+        while i < len(steps) and steps[i] < target:
+            i += 1
+        step = steps[max(0, i - 1)]
+    elif step is None:
+        level = math.ceil(math.log(maxbins) / logb)
+        step = max(minstep, base ** (round(math.log(span) / logb) - level))
+        while math.ceil(span / step) > maxbins:
+            step *= base
+        for div in divide:
+            candidate = step / div
+            if candidate >= minstep and span / candidate <= maxbins:
+                step = candidate
+    v = math.log(step)
+    precision = 0 if v >= 0 else int(-v / logb) + 1
+    eps = base ** (-precision - 1)
+    if nice:
+        v = math.floor(low / step + eps) * step
+        low = v - step if low < v else v
+        high = math.ceil(high / step) * step
+    return low, (low + step if high == low else high), step
+
+
+def apply_bin(data, transform):
+    options = transform["bin"] if isinstance(transform["bin"], dict) else {}
+    options = {key: value for key, value in options.items() if key != "binned"}
+    field = transform["field"]
+    outputs = transform["as"] if isinstance(transform["as"], list) else [transform["as"], f"{transform['as']}_end"]
+    values = pd.to_numeric(data[field], errors="coerce")
+    extent = options.pop("extent", None) or (values.min(), values.max())
+    if "anchor" in options:
+        raise Unsupported("bin anchors are not supported")
+    start, stop, step = bin_params(extent, **options)
+    # Same as vega-transforms Bin: clamp into [start, stop - step], then floor to the step
+    clamped = values.clip(lower=start, upper=stop - step)
+    bins = start + step * np.floor(1e-14 + (clamped - start) / step)
+    bins = bins.mask(values < start, -np.inf).mask(values > stop, np.inf)
+    return data.assign(**{outputs[0]: bins, outputs[1]: bins + step})
+
+
+TRANSFORMS = {
+    "filter": apply_filter,
+    "calculate": apply_calculate,
+    "aggregate": apply_aggregate,
+    "joinaggregate": apply_joinaggregate,
+    "bin": apply_bin,
+}
+
+
+def run_transforms(data, transforms):
+    """Apply the leading supported transforms; returns (data, transforms left for the browser)."""
+    for i, transform in enumerate(transforms):
+        kind = next((key for key in TRANSFORMS if key in transform), None)
+        if kind is None:
+            return data, transforms[i:]
+        try:
+            data = TRANSFORMS[kind](data, transform)
+        except Unsupported:
+            return data, transforms[i:]
+    return data, []
+
+
+# ---------------------------------------------------------------------------
+# Encoding aggregates, e.g. y="sum(Population):Q"
+# ---------------------------------------------------------------------------
+
+def _field_defs(encoding):
+    for channel, definition in encoding.items():
+        for item in definition if isinstance(definition, list) else [definition]:
+            if isinstance(item, dict):
+                yield channel, item
+
+
+def default_title(op, field):
+    # Vega-Lite's own axis/legend/tooltip title for an aggregated field
+    return "Count of Records" if op == "count" else f"{op[0].upper()}{op[1:]} of {field}"
+
+
+def aggregate_encoding(data, encoding):
+    """Group by the plain fields and compute every aggregated channel in pandas."""
+    aggregated, keys = [], []
+    for channel, item in _field_defs(encoding):
+        if any(key in item for key in ("bin", "timeUnit", "condition")) or isinstance(item.get("sort"), dict):
+            raise Unsupported(f"{channel} can't be aggregated ahead of time")
+        if "aggregate" in item:
+            if not isinstance(item["aggregate"], str):
+                raise Unsupported("argmin/argmax aggregates are not supported")
+            aggregated.append(item)
+        elif "field" in item and item["field"] not in keys:
+            keys.append(item["field"])
+    if not aggregated:
+        return data, encoding
+
+    measures = []
+    for item in aggregated:
+        op, field = item["aggregate"], item.get("field")
+        output = "__count" if op == "count" else f"{op}_{field}"
+        if (op, field, output) not in measures:
+            measures.append((op, field, output))
+        item.pop("aggregate")
+        item.setdefault("title", default_title(op, field))
+        item["field"] = output
+    return _aggregate_groups(data, keys, measures), encoding
+
+
+# ---------------------------------------------------------------------------
+# Chart rewriting and verification
+# ---------------------------------------------------------------------------
+
+def pushdown_view(chart, top_level=True):
+    """Run one single-view chart's transforms in pandas and rebuild it on the reduced rows."""
+    data = chart.data
+    probe = chart.copy(deep=True, ignore=["data"])
+    probe.data = data.head(0)
+    spec = probe.to_dict()
+    if spec.get("params") or "selection" in spec:
+        # Selections re-filter the rows in the browser
+        return chart
+    for key in ("$schema", "data", "datasets"):
+        spec.pop(key, None)
+    if not top_level:
+        # Layers and concatenated views take their config from the top-level chart
+        spec.pop("config", None)
+
+    reduced, remaining = run_transforms(data, spec.get("transform", []))
+    if remaining:
+        spec["transform"] = remaining
+    else:
+        spec.pop("transform", None)
+        try:
+            reduced, spec["encoding"] = aggregate_encoding(reduced, spec.get("encoding", {}))
+        except Unsupported:
+            pass
+    if reduced is data:
+        return chart
+
+    rebuilt = type(chart).from_dict({**spec, "data": {"values": []}})
+    rebuilt.data = reduced.reset_index(drop=True)
+    return rebuilt
+
+
+def pushdown(chart, top_level=True):
+    """Evaluate the supported transforms of every view in pandas and embed only their output.
+
+    Filter and calculate expressions, aggregate, joinaggregate and bin transforms run here,
+    in spec order, until the first one that can't (selections, lookups, windows, ...);
+    that one and everything after it stays in the spec. Views left without transforms
+    also have their encoding aggregates (e.g. "sum(Population):Q") computed ahead of time.
+    """
+    if isinstance(chart, alt.Chart):
+        if isinstance(chart.data, pd.DataFrame):
+            chart = pushdown_view(chart, top_level)
+    else:
+        chart = chart.copy(deep=True, ignore=["data"])
+        if (isinstance(chart, alt.LayerChart) and isinstance(chart.data, pd.DataFrame)
+                and chart.transform is alt.Undefined):
+            # `bars + labels` moves the shared frame up to the layer; hand it back to
+            # each layer so each one can reduce it with its own transforms
+            for child in chart.layer:
+                if child.data is alt.Undefined:
+                    child.data = chart.data
+            chart.data = alt.Undefined
+        for attribute in ("layer", "hconcat", "vconcat", "concat"):
+            children = getattr(chart, attribute, alt.Undefined)
+            if children is not alt.Undefined:
+                setattr(chart, attribute, [pushdown(child, top_level=False) for child in children])
+    return prune_chart_data(chart) if top_level else chart
+
+
+def render_png(chart):
+    import vl_convert
+
+    with alt.data_transformers.disable_max_rows():
+        spec = chart.to_dict()
+    return vl_convert.vegalite_to_png(spec, scale=1)
+
+
+def verify(original, optimized):
+    """Render both charts headlessly and check they draw the same pixels.
+
+    Returns True or False, or None when vl-convert (or Pillow) isn't installed.
+    """
+    try:
+        from PIL import Image
+        expected, actual = render_png(original), render_png(optimized)
+    except ImportError:
+        return None
+    if expected == actual:
+        return True
+    expected = np.asarray(Image.open(io.BytesIO(expected)).convert("RGBA"), dtype=np.int16)
+    actual = np.asarray(Image.open(io.BytesIO(actual)).convert("RGBA"), dtype=np.int16)
+    # Allow anti-aliasing noise from float rounding, not a different picture
+    return expected.shape == actual.shape and np.abs(expected - actual).max() <= 8
+
+
+def optimize(chart, check=True):
+    """Pushed-down chart plus whether it was verified (True/False, None = not checked)."""
+    optimized = pushdown(chart)
+    if not check:
+        return optimized, None
+    return optimized, verify(chart, optimized)
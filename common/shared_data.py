@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+
+import altair as alt
+
+TRANSFORMER_NAME = "shared_json"
+DATA_DIR_NAME = "data"
+
+
+def shared_json(data, output_dir=".", data_dir=DATA_DIR_NAME):
+    """Altair data transformer that writes each distinct dataset once as content-hashed JSON.
+
+    The spec only carries a relative URL, so every HTML file in output_dir that uses the
+    same rows points at the same file and the browser downloads it once.
+    """
+    if isinstance(data, dict) and "url" in data:
+        return data
+    values = alt.utils.data.to_values(data)["values"]
+    payload = json.dumps(values, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    filename = f"data-{digest}.json"
+    folder = os.path.join(output_dir, data_dir)
+    target = os.path.join(folder, filename)
+    if not os.path.exists(target):
+        os.makedirs(folder, exist_ok=True)
+        # Parallel renders may write the same file, so write-then-rename keeps it atomic
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(payload)
+        os.replace(tmp_path, target)
+    return {"url": f"{data_dir}/{filename}", "format": {"type": "json"}}
+
+
+if TRANSFORMER_NAME not in alt.data_transformers.names():
+    alt.data_transformers.register(TRANSFORMER_NAME, shared_json)
+
+
+def external_data(output_dir=".", data_dir=DATA_DIR_NAME):
+    """Enable shared data files for charts saved to output_dir.
+
+    Works as a plain call or as a context manager:
+        with external_data("reports"):
+            html = chart.to_html()
+    """
+    return alt.data_transformers.enable(TRANSFORMER_NAME, output_dir=output_dir, data_dir=data_dir)
+
+
+def save_html(chart, filename, output_dir=".", data_dir=DATA_DIR_NAME):
+    """Save a chart as HTML that loads its rows from the shared data files.
+
+    chart.save() always inlines the data, so the HTML is rendered here instead.
+    Browsers block fetches from file:// pages, so serve the folder over HTTP to view it.
+    """
+    with external_data(output_dir, data_dir):
+        html = chart.to_html()
+    with open(os.path.join(output_dir, filename), "w", encoding="utf-8") as f:
+        f.write(html)
+
+
+def prune_data_files(output_dir=".", data_dir=DATA_DIR_NAME):
+    """Remove data files that no HTML file in output_dir refers to any more."""
+    folder = os.path.join(output_dir, data_dir)
+    if not os.path.isdir(folder):
+        return []
+    referenced = set()
+    for name in os.listdir(output_dir):
+        if name.endswith(".html"):
+            with open(os.path.join(output_dir, name), "r", encoding="utf-8") as f:
+                html = f.read()
+            referenced.update(n for n in os.listdir(folder) if f"{data_dir}/{n}" in html)
+    removed = []
+    for name in os.listdir(folder):
+        if name.startswith("data-") and name.endswith(".json") and name not in referenced:
+            os.remove(os.path.join(folder, name))
+            removed.append(name)
+    return removed
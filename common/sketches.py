@@ -0,0 +1,341 @@
+import base64
+import json
+import os
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# Items kept by the top compactor of a quantile sketch; rank error is about 1.7 / QUANTILE_K
+QUANTILE_K = 1000
+
+# HyperLogLog uses 2**DISTINCT_P registers; relative error is about 1.04 / sqrt(2**DISTINCT_P)
+DISTINCT_P = 12
+
+SKETCH_VERSION = 1
+
+
+class QuantileSketch:
+    """KLL quantile sketch: a stack of compactors, where level h holds items of weight 2**h.
+
+    When a level overflows it is sorted and every other item (from a random offset) moves
+    up a level, so memory stays O(k) for any number of values. Two sketches merge by
+    concatenating their levels and compacting again.
+    """
+
+    def __init__(self, k=QUANTILE_K, seed=0):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind at its weight
+                kept, items = (items[-1:], items[:-1]) if len(items) % 2 else (items[:0], items)
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level] = kept
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                # A new level shrinks the capacities below it, so start over
+                level = 0
+                continue
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.count += len(values)
+            self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        """Approximate quantiles (NaN for an empty sketch)."""
+        qs = np.asarray(qs, dtype="float64")
+        if self.count == 0:
+            return np.full(qs.shape, np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        ranks = qs * (cumulative[-1] - 1)
+        return items[np.minimum(np.searchsorted(cumulative, ranks, side="right"), len(items) - 1)]
+
+    def to_dict(self):
+        return {"k": self.k, "count": self.count, "levels": [items.tolist() for items in self.levels]}
+
+    @classmethod
+    def from_dict(cls, state):
+        sketch = cls(state["k"])
+        sketch.count = state["count"]
+        sketch.levels = [np.asarray(items, dtype="float64") for items in state["levels"]]
+        return sketch
+
+
+def hash_values(values):
+    """64-bit hashes of a column's values; numbers hash by value whatever their dtype."""
+    values = pd.Series(values).dropna()
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return pd.util.hash_array(values.to_numpy(dtype="float64"))
+    return pd.util.hash_array(values.astype(str).to_numpy(dtype=object))
+
+
+class DistinctSketch:
+    """HyperLogLog distinct count: per register, the longest run of leading zero hash bits seen.
+
+    Registers merge with an element-wise max, so partitions can be sketched separately.
+    """
+
+    def __init__(self, p=DISTINCT_P):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def update(self, values):
+        hashes = hash_values(values)
+        if len(hashes):
+            index = (hashes >> np.uint64(64 - self.p)).astype(np.intp)
+            rest = (hashes & np.uint64((1 << (64 - self.p)) - 1)).astype("float64")
+            # Leading zeros of the remaining bits, plus one; float rounding only matters near powers of two
+            bits = np.where(rest > 0, np.frexp(rest)[1], 0)
+            np.maximum.at(self.registers, index, (64 - self.p - bits + 1).astype(np.uint8))
+        return self
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(2.0 ** -self.registers.astype("float64"))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and empty:
+            # Linear counting is more accurate while many registers are still empty
+            estimate = m * np.log(m / empty)
+        return int(round(estimate))
+
+    def to_dict(self):
+        return {"p": self.p, "registers": base64.b64encode(self.registers.tobytes()).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, state):
+        sketch = cls(state["p"])
+        sketch.registers = np.frombuffer(base64.b64decode(state["registers"]), dtype=np.uint8).copy()
+        return sketch
+
+
+class ColumnSketch:
+    """Rows, missing values, exact min/max, distinct count and (for numbers) quantiles of one column."""
+
+    def __init__(self, numeric):
+        self.rows = 0
+        self.missing = 0
+        self.min = None
+        self.max = None
+        self.quantile_sketch = QuantileSketch() if numeric else None
+        self.distinct_sketch = DistinctSketch()
+
+    def update(self, values):
+        self.rows += len(values)
+        self.missing += int(values.isna().sum())
+        self.distinct_sketch.update(values)
+        if self.quantile_sketch is not None:
+            numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+            if (~np.isnan(numbers)).any():
+                self._extend(float(np.nanmin(numbers)), float(np.nanmax(numbers)))
+            self.quantile_sketch.update(numbers)
+        return self
+
+    def _extend(self, low, high):
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.missing += other.missing
+        self.distinct_sketch.merge(other.distinct_sketch)
+        if self.quantile_sketch is not None and other.min is not None:
+            self._extend(other.min, other.max)
+            self.quantile_sketch.merge(other.quantile_sketch)
+        return self
+
+    def range(self):
+        return self.min, self.max
+
+    def quantiles(self, qs):
+        """Approximate quantiles; 0 and 1 give the exact min and max."""
+        values = self.quantile_sketch.quantiles(qs)
+        qs = np.asarray(qs, dtype="float64")
+        return np.where(qs <= 0, self.min, np.where(qs >= 1, self.max, values))
+
+    def distinct(self):
+        return self.distinct_sketch.count()
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "missing": self.missing,
+            "min": self.min,
+            "max": self.max,
+            "quantiles": self.quantile_sketch.to_dict() if self.quantile_sketch is not None else None,
+            "distinct": self.distinct_sketch.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        sketch = cls(numeric=state["quantiles"] is not None)
+        sketch.rows, sketch.missing = state["rows"], state["missing"]
+        sketch.min, sketch.max = state["min"], state["max"]
+        if state["quantiles"] is not None:
+            sketch.quantile_sketch = QuantileSketch.from_dict(state["quantiles"])
+        sketch.distinct_sketch = DistinctSketch.from_dict(state["distinct"])
+        return sketch
+
+
+class TableSketch:
+    """A ColumnSketch per column, updated a frame (or chunk) at a time.
+
+        sketch = TableSketch().update(data)
+        low, high = sketch["stress_level"].range()
+        p05, p95 = sketch["daily_social_media_time"].quantiles([0.05, 0.95])
+
+    Sketches of different chunks or partitions merge with merge(), and round-trip
+    through JSON with to_dict() / from_dict().
+    """
+
+    def __init__(self, columns=None):
+        self.names = list(columns) if columns is not None else None
+        self.columns = {}
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def __contains__(self, column):
+        return column in self.columns
+
+    def update(self, data):
+        for name in self.names if self.names is not None else data.columns:
+            values = data[name]
+            if name not in self.columns:
+                numeric = pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)
+                self.columns[name] = ColumnSketch(numeric)
+            self.columns[name].update(values)
+        return self
+
+    def merge(self, other):
+        for name, sketch in other.columns.items():
+            if name in self.columns:
+                self.columns[name].merge(sketch)
+            else:
+                self.columns[name] = ColumnSketch.from_dict(sketch.to_dict())
+        return self
+
+    def to_dict(self):
+        return {"version": SKETCH_VERSION, "columns": {name: sketch.to_dict() for name, sketch in self.columns.items()}}
+
+    @classmethod
+    def from_dict(cls, state):
+        sketch = cls()
+        sketch.columns = {name: ColumnSketch.from_dict(column) for name, column in state["columns"].items()}
+        return sketch
+
+
+def merge_sketches(sketches):
+    """One TableSketch covering every input sketch (e.g. the partitions of a query)."""
+    merged = TableSketch()
+    for sketch in sketches:
+        merged.merge(sketch)
+    return merged
+
+
+def sketch_path(source, cache_dir=".data_cache"):
+    """Sidecar file for a dataset's sketches, next to its other cached forms."""
+    folder = os.path.join(os.path.dirname(os.path.abspath(source)), cache_dir)
+    return os.path.join(folder, os.path.basename(source).split(".")[0] + ".sketch.json")
+
+
+def cached_sketch(source, data):
+    """The sketches of a dataset loaded from source, rebuilt from data when the file changed."""
+    path = sketch_path(source)
+    stat = os.stat(source)
+    try:
+        with open(path, "r") as f:
+            cached = json.load(f)
+        if (cached["version"] == SKETCH_VERSION and cached["source_mtime"] == stat.st_mtime
+                and cached["source_size"] == stat.st_size):
+            return TableSketch.from_dict(cached)
+    except (FileNotFoundError, KeyError, json.JSONDecodeError):
+        pass
+    sketch = TableSketch().update(data)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(dict(sketch.to_dict(), source_mtime=stat.st_mtime, source_size=stat.st_size), f)
+    os.replace(tmp_path, path)
+    return sketch
+
+
+# Sketches of loaded frames, looked up by the frame so chart builders that only get the
+# data can still use them; entries go away with their frame
+_attached = {}
+# Reentrant: a frame collected while this thread holds the lock drops its entry under it
+_attached_lock = threading.RLock()
+
+
+def _detach(key):
+    with _attached_lock:
+        _attached.pop(key, None)
+
+
+def attach(data, sketch):
+    """Record the sketches of a loaded frame; returns the frame."""
+    key = id(data)
+    with _attached_lock:
+        _attached[key] = (weakref.ref(data, lambda _: _detach(key)), sketch)
+    return data
+
+
+def sketch_of(data):
+    """The TableSketch attached to this exact frame, or None."""
+    with _attached_lock:
+        entry = _attached.get(id(data))
+    if entry is not None and entry[0]() is data:
+        return entry[1]
+    return None
+
+
+def column_range(data, column):
+    """Min and max of a column, from its sketch when the frame has one."""
+    sketch = sketch_of(data)
+    if sketch is not None and column in sketch:
+        return sketch[column].range()
+    return data[column].min(), data[column].max()
+
+
+def column_quantiles(data, column, qs):
+    """Quantiles of a column; approximate (from the sketch) when the frame has one."""
+    sketch = sketch_of(data)
+    if sketch is not None and column in sketch:
+        return list(sketch[column].quantiles(qs))
+    return [data[column].quantile(q) for q in qs]
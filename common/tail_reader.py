@@ -0,0 +1,125 @@
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Rows the column buffers start with; they double whenever they fill up
+INITIAL_CAPACITY = 1024
+
+
+class CSVTail:
+    """A CSV that only grows, read by byte offset.
+
+    Every refresh() parses just the complete lines appended since the previous one,
+    computes the derived columns (common.derived Features) for those rows only and
+    copies them into per-column buffers that double when full, so a refresh costs
+    amortized O(new rows). Bytes after the last newline are left for a later refresh.
+    If the file is replaced or truncated it is read again from the start.
+
+        tail = CSVTail("results.csv", {"log_MIC": neg_log10("MIC", decimals=2)})
+        tail.refresh()
+        recent = tail.window(1000)   # O(1000), however long the file is
+        data = tail.frame()          # O(rows)
+
+    One instance can be shared between threads (e.g. in st.cache_resource).
+    """
+
+    def __init__(self, path, features=None, **read_csv_kwargs):
+        self.path = path
+        self.features = features or {}
+        self.read_csv_kwargs = read_csv_kwargs
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, identity):
+        self._identity = identity
+        self.offset = 0
+        self.header = None
+        self.rows = 0
+        # column -> array with room for more rows than `rows`
+        self._buffers = {}
+        self.generation += 1
+
+    def _parse(self, data):
+        rows = pd.read_csv(io.BytesIO(data), header=None, names=self.header, **self.read_csv_kwargs)
+        for name, feature in self.features.items():
+            rows[name] = feature.compute(rows)
+        return rows
+
+    def _append(self, rows):
+        end = self.rows + len(rows)
+        for name, column in rows.items():
+            values = column.to_numpy()
+            if values.dtype.kind not in "biuf":
+                values = values.astype(object)
+            buffer = self._buffers.get(name)
+            if buffer is None:
+                buffer = np.empty(max(INITIAL_CAPACITY, end), dtype=values.dtype)
+            else:
+                dtype = np.result_type(buffer.dtype, values.dtype)
+                if end > len(buffer) or dtype != buffer.dtype:
+                    # Doubling keeps the copies to O(rows) over the life of the file
+                    grown = np.empty(max(end, 2 * len(buffer)) if end > len(buffer) else len(buffer), dtype=dtype)
+                    grown[:self.rows] = buffer[:self.rows]
+                    buffer = grown
+            buffer[self.rows:end] = values
+            self._buffers[name] = buffer
+        self.rows = end
+
+    def refresh(self):
+        """Read the complete lines appended since the last call and return the number of new rows."""
+        with self._lock:
+            stat = os.stat(self.path)
+            identity = (stat.st_dev, stat.st_ino)
+            if identity != self._identity or stat.st_size < self.offset:
+                self._reset(identity)
+            if stat.st_size == self.offset:
+                return 0
+
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                data = f.read(stat.st_size - self.offset)
+            # Only whole lines; a half-written last line waits for its newline
+            data = data[:data.rfind(b"\n") + 1]
+            if not data:
+                return 0
+            self.offset += len(data)
+
+            if self.header is None:
+                newline = data.find(b"\n")
+                self.header = pd.read_csv(io.BytesIO(data[:newline + 1]), nrows=0).columns.tolist()
+                data = data[newline + 1:]
+            if not data.strip():
+                return 0
+            rows = self._parse(data)
+            self._append(rows)
+            return len(rows)
+
+    def version(self):
+        """Changes whenever new rows were read; use it to detect new data."""
+        with self._lock:
+            return self.generation, self.offset
+
+    def _slice(self, start):
+        if self.header is None:
+            return pd.DataFrame(columns=list(self.features))
+        if not self._buffers:
+            return pd.DataFrame(columns=self.header + list(self.features))
+        return pd.DataFrame({name: buffer[start:self.rows] for name, buffer in self._buffers.items()},
+                            index=pd.RangeIndex(start, self.rows))
+
+    def window(self, n):
+        """The last n rows read, derived columns included; costs O(n)."""
+        with self._lock:
+            return self._slice(max(self.rows - n, 0))
+
+    def frame(self):
+        """All rows read so far, derived columns included; costs O(rows).
+
+        Empty (with the header's columns, once known) until the first rows arrive.
+        """
+        with self._lock:
+            return self._slice(0)
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+
+def search(data, column, text):
+    """Rows whose column contains the text, ignoring case; all rows for an empty search."""
+    text = (text or "").strip()
+    if not text:
+        return data
+    return data[data[column].astype(str).str.contains(text, case=False, regex=False).to_numpy()]
+
+
+def group_counts(data, by):
+    """Rows per group, in order of first appearance."""
+    return data[by].value_counts(sort=False).reindex(pd.unique(data[by]))
+
+
+def group_rows(data, by, expanded):
+    """Rows of the expanded groups, group after group, keeping the row order inside each group."""
+    order = pd.unique(data[by])
+    rank = pd.Series(np.arange(len(order)), index=order)
+    data = data[data[by].isin(expanded).to_numpy()]
+    positions = rank.reindex(data[by]).to_numpy()
+    return data.iloc[np.argsort(positions, kind="stable")]
+
+
+def page_count(total, size):
+    return max(1, -(-total // size))
+
+
+def window(data, page, size):
+    """The 1-based page of `size` rows, plus the offset of its first row."""
+    page = min(max(1, page), page_count(len(data), size))
+    start = (page - 1) * size
+    return data.iloc[start:start + size], start